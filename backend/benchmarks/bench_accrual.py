@@ -0,0 +1,77 @@
+"""
+Earnings Accrual Benchmark
+Seeds synthetic active staking positions (via add_positions_bulk) and runs
+Database.accrue_earnings over all of them, reporting rows/sec for several
+chunk sizes. Memory stays bounded by the chunk size, not the table size.
+
+Each run accrues the time since the previous one, so repeated runs keep
+doing the full amount of work.
+
+Usage (from backend/):
+    DATABASE_URL=postgresql://localhost/deai_db python benchmarks/bench_accrual.py \
+        [--positions 200000] [--chunk-sizes 10000,50000] [--subnets 64]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database import Database, StakingPosition
+from sqlalchemy import func, select
+
+SEED_BATCH = 10000
+
+
+async def seed(db: Database, positions: int, subnets: int):
+    async with db.get_session() as session:
+        existing = await session.scalar(
+            select(func.count()).select_from(StakingPosition).where(StakingPosition.status == "active")
+        )
+    rng = random.Random(7)
+    for start in range(existing, positions, SEED_BATCH):
+        await db.add_positions_bulk([
+            {
+                "user_address": f"5Accrual{rng.randrange(positions // 10 + 1):08d}",
+                "subnet_id": rng.randrange(subnets),
+                "amount": rng.uniform(1.0, 10000.0),
+                "apy": 10.0,
+            }
+            for _ in range(min(SEED_BATCH, positions - start))
+        ])
+    return max(existing, positions)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--positions", type=int, default=200000)
+    parser.add_argument("--chunk-sizes", default="10000,50000")
+    parser.add_argument("--subnets", type=int, default=64)
+    args = parser.parse_args()
+
+    db = Database()
+    await db.connect()
+    if not db.engine:
+        sys.exit("Database unavailable (set DATABASE_URL)")
+
+    total = await seed(db, args.positions, args.subnets)
+    apys = np.random.default_rng(7).uniform(5.0, 30.0, args.subnets)
+    print(f"-- {db.engine.dialect.name}, {total} active positions over {args.subnets} subnets")
+
+    for chunk_size in (int(size) for size in args.chunk_sizes.split(",")):
+        stats = await db.accrue_earnings(apys, chunk_size=chunk_size)
+        print(
+            f"chunk {chunk_size:<10}{stats['rows_per_second']:>12.0f} rows/s"
+            f"   ({stats['rows']} rows in {stats['seconds']:.2f}s, {stats['chunks']} chunks)"
+        )
+
+    await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
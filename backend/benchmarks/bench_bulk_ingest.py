@@ -0,0 +1,89 @@
+"""
+Bulk Ingest Benchmark
+Ingests synthetic stake/unstake/harvest events through Database.add_transactions_bulk
+in batches, and a sample of them through the old per-event path (get_user in
+its own session and commit, then one insert and commit per event), reporting
+events/sec for both.
+
+The per-event path is only run on --per-event-sample events, since at ~4 round
+trips per event 100k of them take minutes against a remote database.
+
+Usage (from backend/):
+    DATABASE_URL=postgresql://localhost/deai_db python benchmarks/bench_bulk_ingest.py \
+        [--events 100000] [--batch 5000] [--addresses 2000] [--per-event-sample 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database import Database, Transaction
+
+TYPES = ("stake", "unstake", "harvest")
+
+
+def make_events(count: int, addresses: int) -> list:
+    rng = random.Random(42)
+    return [
+        {
+            "user_address": f"5Bench{rng.randrange(addresses):08d}",
+            "transaction_type": rng.choice(TYPES),
+            "subnet_id": rng.randrange(64),
+            "amount": round(rng.uniform(0.1, 500.0), 6),
+            "hash": f"0x{i:064x}",
+            "status": "confirmed",
+        }
+        for i in range(count)
+    ]
+
+
+async def per_event(db: Database, event: dict):
+    """Old pattern: ensure the user in one session, insert the event in another"""
+    await db.get_user(event["user_address"])
+    async with db.get_session() as session:
+        session.add(Transaction(**event))
+        await session.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--addresses", type=int, default=2000)
+    parser.add_argument("--per-event-sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    db = Database()
+    await db.connect()
+    if not db.engine:
+        sys.exit("Database unavailable (set DATABASE_URL)")
+
+    events = make_events(args.events, args.addresses)
+    print(f"-- {db.engine.dialect.name}, {args.events} events over {args.addresses} addresses")
+
+    sample = events[:args.per_event_sample]
+    start = time.perf_counter()
+    for event in sample:
+        await per_event(db, event)
+    elapsed = time.perf_counter() - start
+    print(f"{'per-event inserts':<28}{len(sample) / elapsed:>10.0f} events/s"
+          f"   ({len(sample)} events in {elapsed:.2f}s, ~{args.events * elapsed / len(sample):.0f}s for all)")
+
+    start = time.perf_counter()
+    inserted = 0
+    for i in range(0, len(events), args.batch):
+        inserted += await db.add_transactions_bulk(events[i:i + args.batch])
+    elapsed = time.perf_counter() - start
+    print(f"{f'bulk, {args.batch} per batch':<28}{inserted / elapsed:>10.0f} events/s"
+          f"   ({inserted} events in {elapsed:.2f}s)")
+
+    await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Cache Codec Benchmark
+Compares encode/decode time and stored size of CacheCodec configurations
+on synthetic subnet and validator payloads shaped like TAOStats responses.
+
+Usage (from backend/):
+    python benchmarks/bench_cache_codecs.py [--validators 5000] [--rounds 20]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cache import CacheCodec, COMPRESSIONS, SERIALIZERS, lz4_frame, msgpack, zstandard
+
+
+def ss58(rng: random.Random) -> str:
+    """Random SS58-looking address"""
+    return "5" + "".join(rng.choices(string.ascii_letters + string.digits, k=47))
+
+
+def make_subnets(rng: random.Random, count: int = 64) -> list:
+    """Subnet list roughly matching /api/subnets"""
+    return [
+        {
+            "netuid": i,
+            "name": f"Subnet {i}",
+            "owner": ss58(rng),
+            "emission": rng.random() * 0.05,
+            "registration_cost": rng.random() * 1000,
+            "total_stake": rng.random() * 1e6,
+            "validators": rng.randint(1, 64),
+            "neurons": rng.randint(64, 256),
+            "tempo": 360,
+            "registered_at": "2024-01-01T00:00:00Z",
+        }
+        for i in range(count)
+    ]
+
+
+def make_validators(rng: random.Random, count: int) -> list:
+    """Validator list roughly matching /api/validators"""
+    return [
+        {
+            "hotkey": ss58(rng),
+            "coldkey": ss58(rng),
+            "name": f"Validator {i}",
+            "subnet_id": rng.randint(0, 63),
+            "stake": rng.random() * 1e5,
+            "take": round(rng.random() * 0.18, 4),
+            "nominators": rng.randint(0, 5000),
+            "vtrust": rng.random(),
+            "dividends": rng.random() * 0.01,
+            "rank": i,
+        }
+        for i in range(count)
+    ]
+
+
+def bench(codec: CacheCodec, value, rounds: int):
+    """Return (stored bytes, encode ms, decode ms) averaged over rounds"""
+    raw, _ = codec.encode(value, 0.0)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        codec.encode(value, 0.0)
+    encode_ms = (time.perf_counter() - start) * 1000 / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        codec.decode(raw)
+    decode_ms = (time.perf_counter() - start) * 1000 / rounds
+
+    return len(raw), encode_ms, decode_ms
+
+
+def available(serializer: str, compression: str) -> bool:
+    if serializer == "msgpack" and msgpack is None:
+        return False
+    if compression == "zstd" and zstandard is None:
+        return False
+    if compression == "lz4" and lz4_frame is None:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--validators", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    payloads = {
+        "subnets": make_subnets(rng),
+        "validators": make_validators(rng, args.validators),
+    }
+
+    print(f"{'payload':<12}{'serializer':<11}{'compression':<13}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}")
+    for name, value in payloads.items():
+        for serializer in SERIALIZERS:
+            for compression in COMPRESSIONS:
+                if not available(serializer, compression):
+                    continue
+                codec = CacheCodec(serializer, compression, compress_min_bytes=0)
+                size, encode_ms, decode_ms = bench(codec, value, args.rounds)
+                print(f"{name:<12}{serializer:<11}{compression:<13}{size:>12,}{encode_ms:>12.2f}{decode_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Database Concurrency Benchmark
+Compares the old pattern (sync SQLAlchemy session queried inside the request
+coroutine, blocking the event loop) against the async Database service under
+concurrent requests, reporting throughput, latency and the worst event-loop
+stall seen by an unrelated task.
+
+Each request reads one user's staking positions. On PostgreSQL, --query-ms
+adds a server-side pg_sleep to each request to model a slow query; the async
+service overlaps those waits across its pool while the sync one serializes
+them. On SQLite only the real query is run, and aiosqlite's thread hand-off
+makes the async path slower per request; the loop-stall column still shows
+the difference.
+
+Usage (from backend/):
+    DATABASE_URL=postgresql://localhost/deai_db python benchmarks/bench_db_concurrency.py \
+        [--requests 200] [--concurrency 50] [--query-ms 20] [--positions 20]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database import Database, StakingPosition
+
+ADDRESS = "5BenchDbConcurrencyAddress"
+
+
+async def loop_lag_monitor(stalls: list, interval: float = 0.005):
+    """Record how late each short sleep wakes up (time the loop was blocked)"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def sync_positions(Session, delay: float) -> list:
+    """Old pattern: blocking session query inside a coroutine"""
+    session = Session()
+    try:
+        if delay:
+            session.execute(text("SELECT pg_sleep(:delay)"), {"delay": delay})
+        positions = session.scalars(select(StakingPosition).filter_by(user_address=ADDRESS))
+        return [{"id": p.id, "amount": p.amount} for p in positions]
+    finally:
+        session.close()
+
+
+async def async_positions(db: Database, delay: float) -> list:
+    if delay:
+        async with db.get_session() as session:
+            await session.execute(text("SELECT pg_sleep(:delay)"), {"delay": delay})
+    return await db.get_user_staking_positions(ADDRESS)
+
+
+async def run(label: str, call, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    stalls = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    monitor = asyncio.create_task(loop_lag_monitor(stalls))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    # Let the monitor record a wake-up that was delayed by the last blocking call
+    await asyncio.sleep(0.01)
+    monitor.cancel()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<26}{requests / elapsed:>10.0f} req/s"
+        f"{statistics.median(latencies):>10.2f} ms p50"
+        f"{p99:>10.2f} ms p99"
+        f"{max(stalls, default=0):>10.2f} ms max loop stall"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-ms", type=float, default=20.0)
+    parser.add_argument("--positions", type=int, default=20)
+    args = parser.parse_args()
+
+    db = Database()
+    await db.connect()
+    if not db.engine:
+        sys.exit("Database unavailable (set DATABASE_URL)")
+    delay = args.query_ms / 1000 if db.engine.dialect.name == "postgresql" else 0.0
+
+    # Same database through the old sync driver (postgresql:// -> psycopg2, sqlite:// -> sqlite3)
+    sync_engine = create_engine(os.getenv("DATABASE_URL", "postgresql://localhost/deai_db"), pool_pre_ping=True)
+    Session = sessionmaker(bind=sync_engine)
+
+    if len(await db.get_user_staking_positions(ADDRESS)) < args.positions:
+        for subnet_id in range(args.positions):
+            await db.add_staking_position(ADDRESS, subnet_id, 100.0, 0.12)
+
+    print(f"-- {db.engine.dialect.name}, {args.requests} requests, query delay {delay * 1000:.0f} ms")
+    for concurrency in (1, args.concurrency):
+        print(f"-- concurrency {concurrency}")
+        await run("sync session (blocking)", lambda: sync_positions(Session, delay), args.requests, concurrency)
+        await run("async Database", lambda: async_positions(db, delay), args.requests, concurrency)
+
+    sync_engine.dispose()
+    await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Upstream Client Benchmark
+Compares a fresh httpx.AsyncClient per request (the old pattern) against the
+shared pooled client from services/upstream.py, using a local stub server.
+
+The stub can add a delay before the first response on each new connection
+(--handshake-ms) to model the TCP/TLS setup cost of a remote upstream, which a
+pooled client pays once per connection instead of once per request. Point
+--url at a real HTTPS endpoint to measure TLS and HTTP/2 directly.
+
+Usage (from backend/):
+    python benchmarks/bench_upstream_client.py [--requests 200] [--concurrency 20] [--handshake-ms 0]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.resilience import UpstreamGuard
+from services.taostats import TAOStatsService
+from services.upstream import UpstreamConfig, create_upstream_client
+
+BODY = json.dumps([{"netuid": i, "emission": i / 1000} for i in range(64)]).encode()
+
+
+async def handle_connection(reader, writer, handshake_delay: float):
+    """Minimal HTTP/1.1 keep-alive responder"""
+    first = True
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            if not request:
+                break
+            if first and handshake_delay:
+                await asyncio.sleep(handshake_delay)
+            first = False
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(BODY)}\r\n\r\n".encode()
+                + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def fresh_client_call(base_url: str):
+    """Old pattern: new client (and connection) for every call"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{base_url}/subnets", timeout=10.0)
+        response.raise_for_status()
+        return response.json()
+
+
+async def run(label: str, call, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<22}{requests / elapsed:>10.0f} req/s"
+        f"{statistics.mean(latencies):>10.2f} ms mean"
+        f"{statistics.median(latencies):>10.2f} ms p50"
+        f"{p99:>10.2f} ms p99"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=0.0)
+    parser.add_argument("--url", help="Benchmark against this base URL instead of the local stub")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server = await asyncio.start_server(
+            lambda r, w: handle_connection(r, w, args.handshake_ms / 1000), "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        base_url = f"http://127.0.0.1:{port}"
+
+    # Rate limit high enough that only connection handling is measured
+    config = UpstreamConfig("bench", base_url, max_connections=args.concurrency, rate_limit_per_minute=1e9)
+    pooled = create_upstream_client(config)
+    service = TAOStatsService(pooled, UpstreamGuard.from_config(config))
+
+    for concurrency in (1, args.concurrency):
+        print(f"-- concurrency {concurrency}")
+        await run("fresh client per call", lambda: fresh_client_call(base_url), args.requests, concurrency)
+        await run("shared pooled client", service.get_subnets, args.requests, concurrency)
+
+    await pooled.aclose()
+    if server:
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,24 +3,33 @@ DeAI Backend - FastAPI Server
 Live TAO data, Redis caching, PostgreSQL integration
 """
 
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import httpx
 import redis
 import os
 from dotenv import load_dotenv
-from typing import Optional
+from typing import List, Literal, Optional
 import logging
 import asyncio
-from datetime import datetime
+import functools
+from datetime import datetime, timedelta, timezone
 
 # Import services
 from services.taostats import TAOStatsService
-from services.coingecko import CoinGeckoService
-from services.cache import CacheService
-from services.database import Database
+from services.coingecko import CoinGeckoService, MarketSnapshot
+from services.cache import CacheService, CachedResponse, CACHE_POLICIES
+from services.database import Database, InvalidCursor, PRICE_RESOLUTIONS, decode_history_cursor, encode_history_cursor
 from services.auth import AuthService
+from services.upstream import COINGECKO_UPSTREAM, TAOSTATS_UPSTREAM, create_upstream_client
+from services.resilience import TokenBucket, UpstreamError, UpstreamGuard
+from services.scheduler import IngestionScheduler, IngestionSource
+from services.singleflight import SingleFlight
+from services.validator_index import InvalidQuery, ValidatorIndex
+from services.search_index import SS58_PATTERN, SearchIndex, is_ss58, merge_neurons
+from services.accrual import subnet_apys
+from services.simulation import SimulationInputs, emission_volatility, parameter_hash, price_volatility, simulate
 
 load_dotenv()
 
@@ -34,11 +43,19 @@ taostats_service: Optional[TAOStatsService] = None
 coingecko_service: Optional[CoinGeckoService] = None
 db: Optional[Database] = None
 auth_service: Optional[AuthService] = None
+ingestion_scheduler: Optional[IngestionScheduler] = None
+validator_index: Optional[ValidatorIndex] = None
+search_index: Optional[SearchIndex] = None
+index_flights = SingleFlight()
+neuron_ingest_limiter: Optional[TokenBucket] = None
+simulation_inputs: Optional[SimulationInputs] = None
+upstream_clients: list = []
+upstream_guards: dict = {}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage app lifecycle - startup and shutdown"""
-    global cache_service, taostats_service, coingecko_service, db, auth_service
+    global cache_service, taostats_service, coingecko_service, db, auth_service, ingestion_scheduler, neuron_ingest_limiter
     
     # Startup
     logger.info("Starting DeAI Backend...")
@@ -46,10 +63,30 @@ async def lifespan(app: FastAPI):
     try:
         # Initialize services
         cache_service = CacheService()
-        taostats_service = TAOStatsService()
-        coingecko_service = CoinGeckoService()
+        await cache_service.connect()
+        
+        # One long-lived pooled client per upstream, reused by every request
+        taostats_client = create_upstream_client(TAOSTATS_UPSTREAM)
+        coingecko_client = create_upstream_client(COINGECKO_UPSTREAM)
+        upstream_clients.extend([taostats_client, coingecko_client])
+        
+        # Rate limits are shared by all workers through Redis; circuits are per worker
+        for config in (TAOSTATS_UPSTREAM, COINGECKO_UPSTREAM):
+            upstream_guards[config.name] = UpstreamGuard.from_config(config, cache_service.redis_client)
+        taostats_service = TAOStatsService(taostats_client, upstream_guards["taostats"])
+        # Background neuron fan-out gets its own small share of the TAOStats quota
+        neuron_ingest_limiter = TokenBucket(
+            "taostats:neurons", NEURON_INGEST_RATE_LIMIT, 1, cache_service.redis_client
+        )
+        coingecko_service = CoinGeckoService(coingecko_client, upstream_guards["coingecko"])
         db = Database()
+        await db.connect()
         auth_service = AuthService(db)
+        
+        # Keep upstream data warm so requests are served from cache
+        if os.getenv("INGESTION_ENABLED", "true").lower() == "true":
+            ingestion_scheduler = IngestionScheduler(cache_service, INGESTION_SOURCES)
+            ingestion_scheduler.start()
 
         # Ensure test login exists (Admin@user.com / Admin@123)
         try:
@@ -71,8 +108,16 @@ async def lifespan(app: FastAPI):
     finally:
         # Shutdown
         logger.info("Shutting down DeAI Backend...")
+        if ingestion_scheduler:
+            await ingestion_scheduler.stop()
+        for client in upstream_clients:
+            await client.aclose()
+        upstream_clients.clear()
+        upstream_guards.clear()
         if cache_service:
-            cache_service.close()
+            await cache_service.close()
+        if db:
+            await db.close()
         logger.info("Cleanup complete")
 
 # Create FastAPI app
@@ -92,6 +137,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def cached_json_response(cached: CachedResponse, request: Request) -> Response:
+    """Return pre-serialized cached bytes, or 304 if the client already has them"""
+    headers = {"ETag": cached.etag}
+    if request.headers.get("if-none-match") == cached.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
 # ============================================
 # HEALTH CHECK
 # ============================================
@@ -105,86 +157,349 @@ async def health_check():
         "services": {
             "cache": "ok" if cache_service else "offline",
             "database": "ok" if db else "offline",
-        }
+        },
+        "upstreams": {name: guard.breaker.state for name, guard in upstream_guards.items()},
     }
 
 # ============================================
 # TAO PRICE ENDPOINTS
 # ============================================
 
+async def get_tao_snapshot() -> MarketSnapshot:
+    """Get the cached TAO market snapshot backing the price and marketcap endpoints"""
+    snapshot = await cache_service.get_or_fetch(
+        "tao_market", coingecko_service.get_tao_snapshot, CACHE_POLICIES["price"]
+    )
+    return MarketSnapshot.from_dict(snapshot)
+
 @app.get("/api/tao/price")
 async def get_tao_price():
-    """Get current TAO price with 30s cache"""
+    """Get current TAO price with 30s cache (stale served up to 5m while refreshing)"""
     try:
-        # Try cache first
-        cached = cache_service.get("tao_price")
-        if cached:
-            return cached
-        
-        # Fetch from CoinGecko
-        price_data = await coingecko_service.get_tao_price()
-        
-        # Cache for 30 seconds
-        cache_service.set("tao_price", price_data, ttl=30)
-        
-        return price_data
+        return (await get_tao_snapshot()).price_data()
         
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable fetching TAO price: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching TAO price: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/tao/marketcap")
 async def get_tao_marketcap():
-    """Get TAO market cap with 5m cache"""
+    """Get TAO market cap (same cached snapshot as the price)"""
     try:
-        cached = cache_service.get("tao_marketcap")
-        if cached:
-            return cached
-        
-        cap_data = await coingecko_service.get_tao_marketcap()
-        cache_service.set("tao_marketcap", cap_data, ttl=300)
-        
-        return cap_data
+        return (await get_tao_snapshot()).marketcap_data()
         
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable fetching TAO marketcap: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching TAO marketcap: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+PRICE_HISTORY_MAX_POINTS = int(os.getenv("PRICE_HISTORY_MAX_POINTS", 500))
+PRICE_BACKFILL_DAYS = int(os.getenv("PRICE_BACKFILL_DAYS", 365))
+# CoinGecko only returns hourly points for ranges up to 90 days
+PRICE_BACKFILL_CHUNK = timedelta(days=90)
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalize a query datetime to the naive UTC the database stores"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def pick_price_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """Finest rollup covering [start, end] in at most max_points candles that is still retained"""
+    now = datetime.utcnow()
+    for resolution, (width, retention) in PRICE_RESOLUTIONS.items():
+        if (end - start) / width <= max_points and (retention is None or start >= now - retention):
+            return resolution
+    return "1d"
+
+async def fetch_price_history() -> list:
+    """CoinGecko samples after the backfill mark (or the whole backfill window on the first run)
+    
+    The mark is the newest backfilled sample and only moves when samples are
+    stored, so a failed run or a downtime gap is fetched again next time; the
+    15s market snapshot samples do not move it. If a later chunk of a long
+    backfill fails, the chunks fetched so far are still returned.
+    """
+    if not db or not db.engine:
+        raise RuntimeError("Database unavailable")
+    now = datetime.utcnow()
+    mark = await db.get_price_backfill_mark()
+    start = mark or now - timedelta(days=PRICE_BACKFILL_DAYS)
+    points = []
+    while start < now:
+        end = min(start + PRICE_BACKFILL_CHUNK, now)
+        try:
+            points += await coingecko_service.get_price_range(start, end)
+        except UpstreamError as e:
+            if not points:
+                raise
+            logger.warning(f"Price backfill stopped at {start.isoformat()}, continuing next run: {e}")
+            break
+        start = end
+    return [point for point in points if mark is None or point[0] > mark]
+
+async def store_price_history(points: list):
+    """Fold new samples into the rollups, advance the backfill mark and prune expired candles"""
+    if points:
+        stored = await db.add_price_points(points, backfilled_until=max(point[0] for point in points))
+        if not stored:
+            raise RuntimeError("Storing price history failed")
+    await db.prune_price_candles()
+
+@app.get("/api/tao/history")
+async def get_tao_history(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: str = "auto",
+    max_points: int = Query(PRICE_HISTORY_MAX_POINTS, ge=1, le=5000),
+):
+    """Get TAO/USD OHLC candles (default: last 30 days)
+    
+    resolution is 1m, 1h, 1d or auto, which picks the finest rollup giving at
+    most max_points candles. Served from stored rollups in one range scan.
+    """
+    end = to_utc_naive(end) if end else datetime.utcnow()
+    start = to_utc_naive(start) if start else end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    if resolution == "auto":
+        resolution = pick_price_resolution(start, end, max_points)
+    elif resolution not in PRICE_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be auto or one of {', '.join(PRICE_RESOLUTIONS)}")
+    
+    try:
+        candles = await db.get_price_candles(resolution, start, end)
+        return {
+            "resolution": resolution,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "candles": candles,
+            "count": len(candles),
+        }
+    except Exception as e:
+        logger.error(f"Error fetching TAO price history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============================================
 # SUBNET ENDPOINTS
 # ============================================
 
+def subnets_payload(subnets: list) -> dict:
+    """Shape served by /api/subnets"""
+    return {"subnets": subnets, "count": len(subnets)}
+
+async def fetch_subnets():
+    """Build subnets response from the shared subnets_list component"""
+    subnets = await cache_service.get_or_fetch(
+        "subnets_list", taostats_service.get_subnets, CACHE_POLICIES["subnets"], allow_stale=False
+    )
+    return subnets_payload(subnets)
+
 @app.get("/api/subnets")
-async def get_subnets():
+async def get_subnets(request: Request):
     """Get all subnets with 60s cache"""
     try:
-        cached = cache_service.get("subnets_list")
-        if cached:
-            return cached
+        cached = await cache_service.get_or_fetch_response(
+            "subnets_list", fetch_subnets, CACHE_POLICIES["subnets"], tags=["subnets"]
+        )
+        return cached_json_response(cached, request)
+        
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable fetching subnets: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching subnets: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Optional per-subnet extras for the batch endpoint: include name -> upstream fetch
+SUBNET_EXTRAS = {
+    "validators": lambda subnet_id: taostats_service.get_subnet_validators(subnet_id),
+    "neurons": lambda subnet_id: taostats_service.get_subnet_neurons(subnet_id),
+}
+SUBNET_BATCH_MAX_IDS = int(os.getenv("SUBNET_BATCH_MAX_IDS", 128))
+SUBNET_BATCH_CONCURRENCY = int(os.getenv("SUBNET_BATCH_CONCURRENCY", 8))
+
+def parse_id_list(ids: str, limit: int) -> list:
+    """Parse a comma-separated id list, dropping duplicates but keeping order"""
+    try:
+        parsed = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(parsed) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} ids per request")
+    return parsed
+
+# Declared before /api/subnets/{subnet_id} so "batch" is not parsed as an id
+@app.get("/api/subnets/batch")
+async def get_subnets_batch(ids: str, include: Optional[str] = None):
+    """Get several subnets (optionally with validators and/or neurons) in one request
+    
+    Every cached entry is read in one round trip; misses are fetched
+    concurrently, at most SUBNET_BATCH_CONCURRENCY upstream calls at a time.
+    A subnet that cannot be fetched is reported under "errors" instead of
+    failing the whole batch.
+    """
+    subnet_ids = parse_id_list(ids, SUBNET_BATCH_MAX_IDS)
+    extras = [part.strip() for part in (include or "").split(",") if part.strip()]
+    unknown = set(extras) - set(SUBNET_EXTRAS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+    
+    try:
+        semaphore = asyncio.Semaphore(SUBNET_BATCH_CONCURRENCY)
+        
+        def bounded(fetch):
+            async def run():
+                async with semaphore:
+                    return await fetch()
+            return run
+        
+        specs, key_tags, fields = {}, {}, {}
+        for subnet_id in subnet_ids:
+            parts = {"subnet": lambda subnet_id=subnet_id: taostats_service.get_subnet(subnet_id)}
+            for extra in extras:
+                parts[extra] = lambda subnet_id=subnet_id, extra=extra: SUBNET_EXTRAS[extra](subnet_id)
+            for field, fetch in parts.items():
+                suffix = "" if field == "subnet" else f"_{field}"
+                key = await cache_service.namespaced_key("subnets", f"subnet_{subnet_id}{suffix}")
+                specs[key] = (bounded(fetch), CACHE_POLICIES["subnets"])
+                key_tags[key] = [f"subnet:{subnet_id}", "subnets"]
+                fields[key] = (subnet_id, field)
         
-        subnets = await taostats_service.get_subnets()
-        cache_service.set("subnets_list", subnets, ttl=60)
+        values = await cache_service.get_or_fetch_many(specs, key_tags=key_tags, return_exceptions=True)
         
-        return {"subnets": subnets, "count": len(subnets)}
+        results = {subnet_id: {"id": subnet_id} for subnet_id in subnet_ids}
+        errors = {}
+        for key, (subnet_id, field) in fields.items():
+            value = values[key]
+            if isinstance(value, Exception):
+                logger.error(f"Error fetching subnet {subnet_id} {field}: {value}")
+                errors[subnet_id] = str(value)
+                continue
+            results[subnet_id][field] = value
+        
+        subnets = [result for subnet_id, result in results.items() if subnet_id not in errors]
+        return {"subnets": subnets, "count": len(subnets), "errors": errors}
         
     except Exception as e:
-        logger.error(f"Error fetching subnets: {e}")
+        logger.error(f"Error fetching subnet batch {ids}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+SUBNET_SNAPSHOT_INTERVAL = float(os.getenv("INGESTION_SUBNET_SNAPSHOTS_INTERVAL", 300))
+SUBNET_SNAPSHOT_RETENTION = timedelta(days=int(os.getenv("SUBNET_SNAPSHOT_RETENTION_DAYS", 180)))
+SUBNET_HISTORY_MAX_POINTS = int(os.getenv("SUBNET_HISTORY_MAX_POINTS", 500))
+SUBNET_HISTORY_RESOLUTIONS = {"5m": 300, "1h": 3600, "1d": 86400}
+
+def subnet_count(subnet: dict, *names: str) -> int:
+    """Read a count field that TAOStats may return as a number or as a list"""
+    for name in names:
+        value = subnet.get(name)
+        if isinstance(value, list):
+            return len(value)
+        if value is not None:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+    return 0
+
+def subnet_snapshot_rows(subnets: list, timestamp: datetime) -> list:
+    """One SubnetSnapshot row per subnet from the cached subnets list"""
+    rows = []
+    for subnet in subnets:
+        subnet_id = subnet.get("netuid", subnet.get("subnet_id"))
+        if subnet_id is None:
+            continue
+        rows.append({
+            "subnet_id": int(subnet_id),
+            "emissions": float(subnet.get("emission", subnet.get("emissions")) or 0.0),
+            "total_validators": subnet_count(subnet, "validators", "total_validators", "validator_count"),
+            "total_neurons": subnet_count(subnet, "neurons", "total_neurons", "neuron_count"),
+            "timestamp": timestamp,
+        })
+    return rows
+
+async def store_subnet_snapshots(subnets: list):
+    """Bulk insert this interval's snapshot rows and prune expired ones
+    
+    Timestamps are aligned to the snapshot interval, so a second write in the
+    same interval (e.g. right after a leader change) is skipped by the unique
+    (subnet_id, timestamp) index.
+    """
+    if not db or not db.engine:
+        raise RuntimeError("Database unavailable")
+    now = datetime.utcnow()
+    epoch = datetime(1970, 1, 1)
+    seconds = int((now - epoch).total_seconds())
+    timestamp = epoch + timedelta(seconds=seconds - seconds % int(SUBNET_SNAPSHOT_INTERVAL))
+    await db.add_subnet_snapshots(subnet_snapshot_rows(subnets, timestamp))
+    await db.prune_subnet_snapshots(SUBNET_SNAPSHOT_RETENTION)
+
+@app.get("/api/subnets/history")
+async def get_subnets_history(
+    ids: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: str = "auto",
+    max_points: int = Query(SUBNET_HISTORY_MAX_POINTS, ge=1, le=5000),
+):
+    """Get emissions/validator/neuron trends for several subnets (default: last 7 days)
+    
+    Snapshots are averaged into buckets of the given resolution (5m, 1h, 1d)
+    or, with auto, the finest one giving at most max_points per subnet.
+    """
+    subnet_ids = parse_id_list(ids, SUBNET_BATCH_MAX_IDS)
+    end = to_utc_naive(end) if end else datetime.utcnow()
+    start = to_utc_naive(start) if start else end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    if resolution == "auto":
+        resolution = next(
+            (
+                name for name, seconds in SUBNET_HISTORY_RESOLUTIONS.items()
+                if seconds >= SUBNET_SNAPSHOT_INTERVAL and (end - start).total_seconds() / seconds <= max_points
+            ),
+            "1d",
+        )
+    elif resolution not in SUBNET_HISTORY_RESOLUTIONS:
+        raise HTTPException(
+            status_code=400, detail=f"resolution must be auto or one of {', '.join(SUBNET_HISTORY_RESOLUTIONS)}"
+        )
+    
+    try:
+        history = await db.get_subnet_history(subnet_ids, start, end, SUBNET_HISTORY_RESOLUTIONS[resolution])
+        return {
+            "resolution": resolution,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "subnets": history,
+        }
+    except Exception as e:
+        logger.error(f"Error fetching subnet history {ids}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/subnets/{subnet_id}")
 async def get_subnet_detail(subnet_id: int):
     """Get specific subnet details"""
     try:
-        cache_key = f"subnet_{subnet_id}"
-        cached = cache_service.get(cache_key)
-        if cached:
-            return cached
-        
-        subnet = await taostats_service.get_subnet(subnet_id)
-        cache_service.set(cache_key, subnet, ttl=60)
-        
-        return subnet
+        cache_key = await cache_service.namespaced_key("subnets", f"subnet_{subnet_id}")
+        return await cache_service.get_or_fetch(
+            cache_key,
+            lambda: taostats_service.get_subnet(subnet_id),
+            CACHE_POLICIES["subnets"],
+            tags=[f"subnet:{subnet_id}", "subnets"],
+        )
         
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable fetching subnet {subnet_id}: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching subnet {subnet_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -193,39 +508,53 @@ async def get_subnet_detail(subnet_id: int):
 # DASHBOARD ENDPOINTS
 # ============================================
 
+# Cache key -> (policy family, upstream fetch) for each dashboard component
+DASHBOARD_COMPONENTS = {
+    "tao_market": ("price", lambda: coingecko_service.get_tao_snapshot()),
+    "subnets_list": ("subnets", lambda: taostats_service.get_subnets()),
+    "market_data": ("market", lambda: taostats_service.get_market_data()),
+}
+
+async def fetch_dashboard():
+    """Build dashboard from the individually cached components
+    
+    Components are read in one round trip; only missing or stale ones are
+    refetched, each under its own TTL and coalesced with the endpoint that
+    owns it (e.g. /api/tao/price for the market snapshot).
+    """
+    components = await cache_service.get_or_fetch_many(
+        {
+            key: (fetch, CACHE_POLICIES[family])
+            for key, (family, fetch) in DASHBOARD_COMPONENTS.items()
+        },
+        allow_stale=False,
+    )
+    snapshot = MarketSnapshot.from_dict(components["tao_market"])
+    
+    return {
+        "tao": {
+            "price": snapshot.price_data(),
+            "marketcap": snapshot.marketcap_data(),
+        },
+        "network": {
+            "subnets": len(components["subnets_list"]),
+            "market": components["market_data"],
+        },
+        "timestamp": datetime.now().isoformat(),
+    }
+
 @app.get("/api/dashboard")
-async def get_dashboard():
+async def get_dashboard(request: Request):
     """Get complete dashboard data (aggregated)"""
     try:
-        cached = cache_service.get("dashboard")
-        if cached:
-            return cached
-        
-        # Fetch all data in parallel
-        price_task = coingecko_service.get_tao_price()
-        marketcap_task = coingecko_service.get_tao_marketcap()
-        subnets_task = taostats_service.get_subnets()
-        market_task = taostats_service.get_market_data()
-        
-        price, marketcap, subnets, market = await asyncio.gather(
-            price_task, marketcap_task, subnets_task, market_task
+        cached = await cache_service.get_or_fetch_response(
+            "dashboard", fetch_dashboard, CACHE_POLICIES["dashboard"]
         )
+        return cached_json_response(cached, request)
         
-        dashboard = {
-            "tao": {
-                "price": price,
-                "marketcap": marketcap,
-            },
-            "network": {
-                "subnets": len(subnets),
-                "market": market,
-            },
-            "timestamp": datetime.now().isoformat(),
-        }
-        
-        cache_service.set("dashboard", dashboard, ttl=60)
-        return dashboard
-        
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable fetching dashboard: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching dashboard: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -235,67 +564,522 @@ async def get_dashboard():
 # ============================================
 
 @app.get("/api/staking/positions/{address}")
-async def get_staking_positions(address: str):
-    """Get user staking positions from database"""
+async def get_staking_positions(address: str, status: Optional[str] = None):
+    """Get user staking positions from database (optionally only active, inactive or completed)"""
     try:
-        positions = db.get_user_staking_positions(address)
+        positions = await db.get_user_staking_positions(address, status)
         return {"positions": positions, "count": len(positions)}
     except Exception as e:
         logger.error(f"Error fetching staking positions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/staking/portfolio/{address}")
+async def get_staking_portfolio(address: str):
+    """Get a user's total staked, earnings, weighted APY and per-subnet breakdown
+    
+    Read from the incrementally maintained portfolio summaries rather than
+    summing every position.
+    """
+    portfolio = await db.get_portfolio(address) if db else None
+    if portfolio is None:
+        raise HTTPException(status_code=500, detail="Portfolio unavailable")
+    return {"address": address, **portfolio}
+
 @app.get("/api/staking/history/{address}")
-async def get_staking_history(address: str, limit: int = 50):
-    """Get user staking transaction history"""
+async def get_staking_history(
+    address: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """Get user staking transaction history, newest first
+    
+    Pass the returned next_cursor to get the following page (null on the last page).
+    """
+    try:
+        after = decode_history_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        history = db.get_user_transaction_history(address, limit)
-        return {"transactions": history, "count": len(history)}
+        history = await db.get_user_transaction_history(address, limit + 1, after)
+        next_cursor = encode_history_cursor(history[limit - 1]) if len(history) > limit else None
+        history = history[:limit]
+        return {"transactions": history, "count": len(history), "next_cursor": next_cursor}
     except Exception as e:
         logger.error(f"Error fetching staking history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+from pydantic import BaseModel, Field
+
+STAKING_BULK_MAX_EVENTS = int(os.getenv("STAKING_BULK_MAX_EVENTS", 10000))
+STAKING_BATCH_MAX_ADDRESSES = int(os.getenv("STAKING_BATCH_MAX_ADDRESSES", 100))
+# Emails of the accounts allowed to ingest staking events (comma-separated; empty denies everyone)
+STAKING_INGEST_USERS = {email.strip().lower() for email in os.getenv("STAKING_INGEST_USERS", "").split(",") if email.strip()}
+
+class TransactionEvent(BaseModel):
+    address: str = Field(pattern=SS58_PATTERN.pattern)
+    type: Literal["stake", "unstake", "harvest"]
+    subnet_id: int = Field(ge=0, le=65535)  # netuids are u16 on chain
+    amount: float = Field(gt=0, allow_inf_nan=False)
+    hash: Optional[str] = Field(None, max_length=128)
+    status: Literal["pending", "confirmed", "failed"] = "pending"
+    timestamp: Optional[datetime] = None
+
+class BulkTransactionsRequest(BaseModel):
+    transactions: List[TransactionEvent] = Field(min_length=1, max_length=STAKING_BULK_MAX_EVENTS)
+
+def require_staking_ingest(authorization: Optional[str]) -> dict:
+    """JWT payload of the caller if it may ingest staking events (401 without a valid token, 403 if not allowed)"""
+    if not auth_service:
+        raise HTTPException(status_code=503, detail="Authentication service unavailable")
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    payload = auth_service.verify_token(authorization.replace("Bearer ", ""))
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if str(payload.get("email", "")).lower() not in STAKING_INGEST_USERS:
+        raise HTTPException(status_code=403, detail="Not allowed to ingest staking events")
+    return payload
+
+@app.post("/api/staking/transactions/bulk")
+async def add_staking_transactions_bulk(request: BulkTransactionsRequest, authorization: str = Header(None)):
+    """Ingest a batch of stake/unstake/harvest events (e.g. one block's worth)
+    
+    Only accounts listed in STAKING_INGEST_USERS may write. Missing users are
+    created with one INSERT ... ON CONFLICT DO NOTHING and the events inserted
+    with one executemany, all in a single transaction: either the whole batch
+    is stored or none of it.
+    """
+    require_staking_ingest(authorization)
+    if not db or not db.engine:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    
+    inserted = await db.add_transactions_bulk([
+        {
+            "user_address": event.address,
+            "transaction_type": event.type,
+            "subnet_id": event.subnet_id,
+            "amount": event.amount,
+            "hash": event.hash,
+            "status": event.status,
+            "timestamp": to_utc_naive(event.timestamp) if event.timestamp else None,
+        }
+        for event in request.transactions
+    ])
+    if inserted != len(request.transactions):
+        raise HTTPException(status_code=500, detail="Bulk insert failed")
+    return {"inserted": inserted}
+
+class BatchPositionsRequest(BaseModel):
+    addresses: List[str] = Field(min_length=1, max_length=STAKING_BATCH_MAX_ADDRESSES)
+    status: Optional[str] = None
+
+class BatchHistoryRequest(BaseModel):
+    addresses: List[str] = Field(min_length=1, max_length=STAKING_BATCH_MAX_ADDRESSES)
+    limit: int = Field(50, ge=1, le=500)
+
+@app.post("/api/staking/positions:batch")
+async def get_staking_positions_batch(request: BatchPositionsRequest):
+    """Staking positions for up to STAKING_BATCH_MAX_ADDRESSES addresses in one query, grouped by address"""
+    try:
+        addresses = list(dict.fromkeys(request.addresses))
+        positions = await db.get_staking_positions_batch(addresses, request.status)
+        return {"positions": positions, "count": sum(len(rows) for rows in positions.values())}
+    except Exception as e:
+        logger.error(f"Error fetching batch staking positions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/staking/history:batch")
+async def get_staking_history_batch(request: BatchHistoryRequest):
+    """Newest limit transactions for each of up to STAKING_BATCH_MAX_ADDRESSES addresses, grouped by address
+    
+    One query; page further back per address with /api/staking/history/{address}.
+    """
+    try:
+        addresses = list(dict.fromkeys(request.addresses))
+        history = await db.get_transaction_history_batch(addresses, request.limit)
+        return {"transactions": history, "count": sum(len(rows) for rows in history.values())}
+    except Exception as e:
+        logger.error(f"Error fetching batch staking history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+SIMULATION_MAX_SUBNETS = int(os.getenv("SIMULATION_MAX_SUBNETS", 16))
+SIMULATION_HISTORY_DAYS = int(os.getenv("SIMULATION_HISTORY_DAYS", 90))
+
+async def build_simulation_inputs() -> dict:
+    """Per-subnet APYs, emission volatility (from stored daily snapshots) and
+    TAO price volatility (from stored daily candles), ready for simulate()"""
+    apys = await fetch_subnet_apys()
+    now = datetime.utcnow()
+    history, candles = {}, []
+    if db and db.engine:
+        history = await db.get_subnet_history(
+            list(range(len(apys))), now - timedelta(days=SIMULATION_HISTORY_DAYS), now, 86400
+        )
+        candles = await db.get_price_candles("1d", now - timedelta(days=365), now)
+    try:
+        price = (await get_tao_snapshot()).price
+    except Exception as e:
+        logger.warning(f"Using last stored TAO price for simulations: {e}")
+        price = candles[-1]["close"] if candles else None
+    return SimulationInputs(
+        apys, emission_volatility(history, len(apys)), price, price_volatility(candles)
+    ).to_dict()
+
+async def get_simulation_inputs() -> SimulationInputs:
+    """Simulation inputs from the cache, rebuilt in this worker only when they were refreshed"""
+    global simulation_inputs
+    data = await cache_service.get_or_fetch(
+        "simulation_inputs", build_simulation_inputs, CACHE_POLICIES["simulation"]
+    )
+    if simulation_inputs is None or simulation_inputs.computed_at != data["computed_at"]:
+        simulation_inputs = SimulationInputs.from_dict(data)
+    return simulation_inputs
+
+@app.get("/api/staking/simulate")
+async def simulate_staking(
+    amount: float = Query(..., gt=0),
+    days: int = Query(365, ge=1, le=1825),
+    subnets: str = Query(...),
+    paths: int = Query(1000, ge=100, le=2000),
+):
+    """Project staking amount TAO for days in each of several subnets
+    
+    Returns the compounded projection at the current APY plus 5/50/95th
+    percentile bands from a Monte Carlo run over each subnet's emission
+    volatility and TAO price volatility (in TAO and USD). All subnets are
+    simulated together as NumPy arrays from inputs precomputed every 5m;
+    results are cached per parameter set and inputs version.
+    """
+    subnet_ids = parse_id_list(subnets, SIMULATION_MAX_SUBNETS)
+    
+    try:
+        inputs = await get_simulation_inputs()
+        key = parameter_hash(inputs, amount=amount, days=days, subnets=subnet_ids, paths=paths)
+        return await cache_service.get_or_fetch(
+            f"simulate:{key}",
+            lambda: asyncio.to_thread(simulate, inputs, amount, days, subnet_ids, paths, int(key[:8], 16)),
+            CACHE_POLICIES["simulation"],
+        )
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable building simulation inputs: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error simulating staking: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============================================
 # VALIDATORS ENDPOINTS
 # ============================================
 
+def validators_payload(validators: list) -> dict:
+    """Shape served by /api/validators"""
+    return {"validators": validators, "count": len(validators)}
+
+async def fetch_validators():
+    """Build validators response from the shared validators_list component"""
+    validators = await cache_service.get_or_fetch(
+        "validators_list",
+        taostats_service.get_validators,
+        CACHE_POLICIES["validators"],
+        tags=["validators"],
+        allow_stale=False,
+    )
+    return validators_payload(validators)
+
+async def build_index(index_class, current, sources: tuple, version):
+    """Index over sources, built in a worker thread unless current already covers them
+    
+    Ingestion rewrites the cached sources (a new version) every run even when
+    nothing changed, so the content hash decides whether to rebuild; both the
+    hash and the build run off the event loop.
+    """
+    content = await asyncio.to_thread(lambda: CachedResponse.from_payload(list(sources)).etag)
+    if current is not None and current.content == content:
+        current.version = version
+        return current
+    return await asyncio.to_thread(functools.partial(index_class, *sources, version=version, content=content))
+
+async def get_validator_index() -> ValidatorIndex:
+    """Columnar index over the cached validators list, rebuilt when its content changes
+    
+    Unchanged cache entry versions skip even the content hash; rebuilds are
+    shared by concurrent requests.
+    """
+    validators, version = await cache_service.get_or_fetch_entry(
+        "validators_list", taostats_service.get_validators, CACHE_POLICIES["validators"], tags=["validators"]
+    )
+    if validator_index is not None and version is not None and validator_index.version == version:
+        return validator_index
+    
+    async def rebuild():
+        global validator_index
+        validator_index = await build_index(ValidatorIndex, validator_index, (validators,), version)
+        return validator_index
+    
+    return await index_flights.do(f"validators:{version}", rebuild)
+
 @app.get("/api/validators")
-async def get_validators():
-    """Get validators list with 60s cache"""
+async def get_validators(
+    request: Request,
+    sort: Optional[str] = None,
+    subnet: Optional[int] = None,
+    min_stake: Optional[float] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+):
+    """Get validators list with 60s cache
+    
+    Without parameters the full cached list is returned. With any of sort
+    (e.g. "-stake", "take", "subnet", "hotkey"), subnet, min_stake, fields
+    (comma-separated), cursor or limit, one page is served from the
+    validator index instead, with "next_cursor" for the following page.
+    """
     try:
-        cached = cache_service.get("validators_list")
-        if cached:
-            return cached
-        
-        validators = await taostats_service.get_validators()
-        cache_service.set("validators_list", validators, ttl=60)
+        if any(param is not None for param in (sort, subnet, min_stake, fields, cursor, limit)):
+            index = await get_validator_index()
+            page = index.query(
+                sort=sort or "-stake",
+                subnet=subnet,
+                min_stake=min_stake,
+                fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+                cursor=cursor,
+                limit=limit or 100,
+            )
+            page["count"] = len(page["validators"])
+            return page
         
-        return {"validators": validators, "count": len(validators)}
+        cached = await cache_service.get_or_fetch_response(
+            "validators_list", fetch_validators, CACHE_POLICIES["validators"], tags=["validators"]
+        )
+        return cached_json_response(cached, request)
         
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable fetching validators: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching validators: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============================================
+# SEARCH ENDPOINTS
+# ============================================
+
+NEURON_INGEST_CONCURRENCY = int(os.getenv("NEURON_INGEST_CONCURRENCY", 4))
+# Upstream calls per minute for the per-subnet neuron fan-out, taken on top of
+# the shared TAOStats bucket so the fan-out can never use more than this share
+NEURON_INGEST_RATE_LIMIT = float(os.getenv("NEURON_INGEST_RATE_LIMIT", 20))
+
+async def fetch_all_neurons() -> list:
+    """Neurons of every subnet, slimmed for the search index
+    
+    Subnets whose neurons cannot be fetched keep the previous run's records.
+    """
+    subnets = await cache_service.get_or_fetch(
+        "subnets_list", taostats_service.get_subnets, CACHE_POLICIES["subnets"]
+    )
+    subnet_ids = [subnet.get("netuid", subnet.get("subnet_id")) for subnet in subnets]
+    subnet_ids = [subnet_id for subnet_id in subnet_ids if subnet_id is not None]
+    semaphore = asyncio.Semaphore(NEURON_INGEST_CONCURRENCY)
+    
+    async def fetch(subnet_id):
+        async with semaphore:
+            # Waits as long as it takes; this runs in the background
+            await neuron_ingest_limiter.acquire(float("inf"))
+            return await taostats_service.get_subnet_neurons(subnet_id)
+    
+    results = await asyncio.gather(*(fetch(subnet_id) for subnet_id in subnet_ids), return_exceptions=True)
+    return merge_neurons(await cache_service.get("neurons_list"), dict(zip(subnet_ids, results)))
+
+async def get_search_index() -> SearchIndex:
+    """Search index over the cached validators and neurons, rebuilt when either changes
+    
+    Neurons are only ingested by the scheduler (one upstream call per subnet),
+    so until the first run the index covers validators alone.
+    """
+    validators, validators_version = await cache_service.get_or_fetch_entry(
+        "validators_list", taostats_service.get_validators, CACHE_POLICIES["validators"], tags=["validators"]
+    )
+    neurons, neurons_version = await cache_service.get_entry("neurons_list") or (None, None)
+    version = (validators_version, neurons_version)
+    if search_index is not None and validators_version is not None and search_index.version == version:
+        return search_index
+    
+    async def rebuild():
+        global search_index
+        search_index = await build_index(SearchIndex, search_index, (validators, neurons), version)
+        return search_index
+    
+    return await index_flights.do(f"search:{version}", rebuild)
+
+@app.get("/api/search")
+async def search(q: str = Query(..., min_length=2, max_length=64), limit: int = Query(10, ge=1, le=50)):
+    """Autocomplete over validator and neuron hotkeys, coldkeys and validator names
+    
+    Answered from the local index; a full SS58 address the index does not know
+    is looked up upstream (cached per address).
+    """
+    try:
+        query = q.strip()
+        index = await get_search_index()
+        results = index.search(query, limit)
+        if results or not is_ss58(query) or index.knows(query):
+            return {"query": query, "results": results, "count": len(results), "source": "index"}
+        
+        cache_key = await cache_service.namespaced_key("search", query)
+        found = await cache_service.get_or_fetch(
+            cache_key, lambda: taostats_service.search_hotkey(query), CACHE_POLICIES["search"]
+        )
+        results = [found] if found else []
+        return {"query": query, "results": results, "count": len(results), "source": "upstream"}
+        
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable searching {q}: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching {q}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============================================
 # EMISSIONS ENDPOINTS
 # ============================================
 
 @app.get("/api/emissions")
-async def get_emissions():
+async def get_emissions(request: Request):
     """Get current emissions data"""
     try:
-        cached = cache_service.get("emissions")
-        if cached:
-            return cached
-        
-        emissions = await taostats_service.get_emissions()
-        cache_service.set("emissions", emissions, ttl=60)
-        
-        return emissions
+        cached = await cache_service.get_or_fetch_response(
+            "emissions", taostats_service.get_emissions, CACHE_POLICIES["emissions"]
+        )
+        return cached_json_response(cached, request)
         
+    except UpstreamError as e:
+        logger.error(f"Upstream unavailable fetching emissions: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching emissions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============================================
+# INGESTION
+# ============================================
+
+async def store_tao_market(snapshot: dict):
+    """Write the market snapshot and record its price as a 1m history sample"""
+    await cache_service.put("tao_market", snapshot, CACHE_POLICIES["price"])
+    if db and snapshot.get("price") is not None:
+        await db.add_price_points([(datetime.utcnow(), snapshot["price"])])
+
+async def store_subnets(subnets: list):
+    """Write the subnets component and the /api/subnets response"""
+    await cache_service.put("subnets_list", subnets, CACHE_POLICIES["subnets"])
+    await cache_service.put_response(
+        "subnets_list", subnets_payload(subnets), CACHE_POLICIES["subnets"], tags=["subnets"]
+    )
+
+async def store_validators(validators: list):
+    """Write the validators component (backing the index) and the /api/validators response"""
+    await cache_service.put("validators_list", validators, CACHE_POLICIES["validators"], tags=["validators"])
+    await cache_service.put_response(
+        "validators_list", validators_payload(validators), CACHE_POLICIES["validators"], tags=["validators"]
+    )
+
+async def fetch_subnet_apys():
+    """Current APY per subnet from the cached subnets list and emissions response
+    
+    Both are kept fresh by their own ingestion sources, so this makes no
+    upstream call of its own while they are cached.
+    """
+    subnets, emissions = await asyncio.gather(
+        cache_service.get_or_fetch("subnets_list", taostats_service.get_subnets, CACHE_POLICIES["subnets"]),
+        cache_service.get_or_fetch_response("emissions", taostats_service.get_emissions, CACHE_POLICIES["emissions"]),
+    )
+    emissions = emissions.payload()
+    return subnet_apys(subnets or [], emissions if isinstance(emissions, dict) else {})
+
+async def store_earnings_accrual(apys):
+    """Compound every active position's earnings up to now at the current subnet APYs"""
+    if not db or not db.engine:
+        raise RuntimeError("Database unavailable")
+    await db.accrue_earnings(apys)
+
+# Written under the same keys the endpoints read, on intervals inside each
+# key's soft TTL so requests never find them stale or missing. The market
+# snapshot backs both /api/tao/price and /api/tao/marketcap.
+INGESTION_SOURCES = [
+    IngestionSource(
+        "tao_market",
+        lambda: coingecko_service.get_tao_snapshot(),
+        store_tao_market,
+        interval=15,
+    ),
+    IngestionSource(
+        "price_history",
+        fetch_price_history,
+        store_price_history,
+        interval=300,
+    ),
+    IngestionSource(
+        "subnets",
+        lambda: taostats_service.get_subnets(),
+        store_subnets,
+        interval=30,
+    ),
+    IngestionSource(
+        "validators",
+        lambda: taostats_service.get_validators(),
+        store_validators,
+        interval=30,
+    ),
+    IngestionSource(
+        "emissions",
+        lambda: taostats_service.get_emissions(),
+        lambda emissions: cache_service.put_response("emissions", emissions, CACHE_POLICIES["emissions"]),
+        interval=30,
+    ),
+    IngestionSource(
+        "subnet_snapshots",
+        lambda: cache_service.get_or_fetch("subnets_list", taostats_service.get_subnets, CACHE_POLICIES["subnets"]),
+        store_subnet_snapshots,
+        interval=SUBNET_SNAPSHOT_INTERVAL,
+    ),
+    IngestionSource(
+        "neurons",
+        fetch_all_neurons,
+        lambda neurons: cache_service.put("neurons_list", neurons, CACHE_POLICIES["neurons"]),
+        interval=300,
+    ),
+    IngestionSource(
+        "earnings_accrual",
+        fetch_subnet_apys,
+        store_earnings_accrual,
+        interval=3600,
+    ),
+    IngestionSource(
+        "simulation_inputs",
+        build_simulation_inputs,
+        lambda inputs: cache_service.put("simulation_inputs", inputs, CACHE_POLICIES["simulation"]),
+        interval=300,
+    ),
+    IngestionSource(
+        "market_data",
+        lambda: taostats_service.get_market_data(),
+        lambda market: cache_service.put("market_data", market, CACHE_POLICIES["market"]),
+        interval=30,
+    ),
+]
+
+@app.get("/api/ingestion/status")
+async def get_ingestion_status():
+    """Freshness (age) and lag of each pre-warmed upstream source"""
+    if not ingestion_scheduler:
+        raise HTTPException(status_code=503, detail="Ingestion scheduler disabled")
+    return await ingestion_scheduler.get_stats()
+
 # ============================================
 # AUTHENTICATION ENDPOINTS
 # ============================================
@@ -0,0 +1,111 @@
+"""
+Earnings Accrual
+Per-subnet staking yields from TAOStats data and vectorized compounding of
+position earnings
+"""
+
+import os
+import logging
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+# APYs are percentages everywhere outside the compounding math (TAOStats'
+# reported APY, staking_positions.apy, the API and the frontend): 12.5 is 12.5%
+
+# Network-wide TAO emitted per day when the emissions payload does not say,
+# and the part of a subnet's emission paid to validators and their stakers
+DAILY_EMISSION = float(os.getenv("ACCRUAL_DAILY_EMISSION", 3600))
+STAKER_SHARE = float(os.getenv("ACCRUAL_STAKER_SHARE", 0.41))
+
+# Upstream field names, in order of preference
+SUBNET_FIELDS = {
+    "subnet": ("netuid", "subnet_id"),
+    "apy": ("apy", "staking_apy"),
+    "emission": ("emission", "emissions"),
+    "stake": ("total_stake", "stake"),
+}
+DAILY_EMISSION_FIELDS = ("daily_emission", "emission_per_day")
+
+# Positions loaded per chunk, and rows per UPDATE ... FROM VALUES statement
+# (3 bind parameters a row, under asyncpg's 32767 limit)
+CHUNK_SIZE = int(os.getenv("ACCRUAL_CHUNK_SIZE", 50000))
+UPDATE_BATCH = 10000
+
+
+def _first(row: Dict[str, Any], names: Sequence[str]) -> Any:
+    for name in names:
+        value = row.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _column(rows: List[Dict[str, Any]], field: str) -> np.ndarray:
+    """Float column of one SUBNET_FIELDS entry (NaN where missing or not a number)"""
+    values = []
+    for row in rows:
+        try:
+            values.append(float(_first(row, SUBNET_FIELDS[field])))
+        except (TypeError, ValueError):
+            values.append(np.nan)
+    return np.array(values, dtype=np.float64)
+
+
+def subnet_apys(subnets: List[Dict[str, Any]], emissions: Dict[str, Any]) -> np.ndarray:
+    """Current staking APY in percent per subnet, indexed by subnet id (NaN where unknown)
+
+    Uses the subnet's own APY when TAOStats reports one; otherwise the
+    stakers' share of the subnet's emission over a year, divided by its
+    total stake. Emission values are normalized to shares of the network
+    total, so either fractions or raw amounts work.
+    """
+    subnets = [row for row in subnets if isinstance(row, dict)]
+    ids = _column(subnets, "subnet")
+    known = ~np.isnan(ids) & (ids >= 0)
+    subnets = [row for row, ok in zip(subnets, known) if ok]
+    ids = ids[known].astype(np.int64)
+    apys = np.full(int(ids.max()) + 1 if len(ids) else 0, np.nan)
+    if not len(ids):
+        return apys
+
+    try:
+        daily = float(_first(emissions or {}, DAILY_EMISSION_FIELDS) or DAILY_EMISSION)
+    except (TypeError, ValueError):
+        daily = DAILY_EMISSION
+
+    emission = np.nan_to_num(_column(subnets, "emission"))
+    total = emission.sum()
+    share = emission / total if total > 0 else np.zeros_like(emission)
+    stake = _column(subnets, "stake")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derived = np.where(stake > 0, share * daily * STAKER_SHARE * 365 / stake * 100, np.nan)
+
+    reported = _column(subnets, "apy")
+    apys[ids] = np.where(np.isnan(reported), derived, reported)
+    return apys
+
+
+def growth_rate(apy: np.ndarray) -> np.ndarray:
+    """Continuous yearly growth rate of an APY in percent (negative APYs count as 0)"""
+    return np.log1p(np.maximum(apy, 0.0) / 100)
+
+
+def accrue(
+    amount: np.ndarray,
+    earnings: np.ndarray,
+    apy: np.ndarray,
+    elapsed_seconds: np.ndarray,
+) -> np.ndarray:
+    """Earnings after compounding amount + earnings at apy (percent) for elapsed_seconds
+
+    Rewards are restaked, so they compound; expm1/log1p keep short intervals
+    at small APYs accurate.
+    """
+    years = np.maximum(elapsed_seconds, 0.0) / SECONDS_PER_YEAR
+    growth = np.expm1(growth_rate(apy) * years)
+    return earnings + (amount + earnings) * growth
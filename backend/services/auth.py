@@ -3,6 +3,7 @@ Authentication Service
 Handles user authentication, JWT tokens, and password hashing
 """
 
+import asyncio
 import jwt
 import bcrypt
 from datetime import datetime, timedelta
@@ -62,8 +63,8 @@ class AuthService:
         if existing_user:
             raise ValueError("User with this email already exists")
         
-        # Hash password
-        hashed_password = self.hash_password(password)
+        # Hash password (bcrypt is CPU-bound, so keep it off the event loop)
+        hashed_password = await asyncio.to_thread(self.hash_password, password)
         
         # Create user in database
         user = await self.db.create_user(
@@ -82,7 +83,7 @@ class AuthService:
             return None
         
         # Verify password
-        if not self.verify_password(password, user['password_hash']):
+        if not await asyncio.to_thread(self.verify_password, password, user['password_hash']):
             return None
         
         # Update last login
@@ -3,89 +3,1026 @@ Redis Cache Service
 Handles caching with TTL support
 """
 
-import redis
+import redis.asyncio as redis
+import asyncio
+import hashlib
 import json
 import os
-from typing import Any, Optional
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 import logging
 
+from services.singleflight import SingleFlight
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
 logger = logging.getLogger(__name__)
 
+# Pub/sub channel used to tell other workers to drop their local copies
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Redis key prefixes for tag membership sets and namespace version counters
+TAG_PREFIX = "tag:"
+NAMESPACE_PREFIX = "ns:"
+
+# Long-lived copies of fetched values, served when the upstream is unavailable
+LAST_GOOD_PREFIX = "lkg:"
+
+# Keys per SCAN page / UNLINK call
+BATCH_SIZE = 500
+
+# Compare-and-delete so a worker only releases a fetch lock it still owns
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Extend a lock's TTL only while we still own it
+RENEW_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class CachePolicy:
+    """Soft/hard TTL pair for stale-while-revalidate caching
+
+    Before soft_ttl a cached value is fresh. Between soft_ttl and hard_ttl it is
+    served as-is while a background task refreshes it. After hard_ttl it is gone.
+    """
+
+    def __init__(self, soft_ttl: int, hard_ttl: int):
+        """Initialize policy (TTLs in seconds)"""
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+
+    @classmethod
+    def from_env(cls, family: str, soft_ttl: int, hard_ttl: int) -> "CachePolicy":
+        """Build policy from CACHE_<FAMILY>_SOFT_TTL / CACHE_<FAMILY>_HARD_TTL overrides"""
+        prefix = f"CACHE_{family.upper()}"
+        return cls(
+            soft_ttl=int(os.getenv(f"{prefix}_SOFT_TTL", soft_ttl)),
+            hard_ttl=int(os.getenv(f"{prefix}_HARD_TTL", hard_ttl)),
+        )
+
+
+class CachedResponse:
+    """Pre-serialized JSON response body with its ETag"""
+
+    __slots__ = ("body", "etag", "media_type", "error")
+
+    def __init__(self, body: bytes, etag: str, media_type: str = "application/json", error: bool = False):
+        """Initialize from already encoded body bytes (error: the payload was an error placeholder)"""
+        self.body = body
+        self.etag = etag
+        self.media_type = media_type
+        self.error = error
+
+    @classmethod
+    def from_payload(cls, payload: Any) -> "CachedResponse":
+        """Encode payload once into compact UTF-8 JSON, as FastAPI's JSONResponse would"""
+        if orjson is not None:
+            body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            body = json.dumps(
+                payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8")
+        etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        return cls(body, etag, error=is_error_payload(payload))
+
+    def payload(self) -> Any:
+        """Decode the body back into the payload it was built from"""
+        return orjson.loads(self.body) if orjson is not None else json.loads(self.body)
+
+
+def is_error_payload(value: Any) -> bool:
+    """Whether a fetched value is an error placeholder ({"error": ...}) rather than data"""
+    if isinstance(value, CachedResponse):
+        return value.error
+    return isinstance(value, dict) and bool(value.get("error"))
+
+
+# ============================================
+# CODECS
+# ============================================
+
+# Format tag byte stored in front of every entry: serializer | compression | kind.
+# Entries written before tags existed are plain JSON ("{", "[", '"', digits, ...)
+# or start with "R" (response header format); none of those bytes is a valid
+# tag, so any byte outside VALID_TAGS is decoded as a legacy entry.
+SERIALIZER_JSON = 0x01
+SERIALIZER_MSGPACK = 0x02
+COMPRESSION_ZLIB = 0x10
+COMPRESSION_ZSTD = 0x20
+COMPRESSION_LZ4 = 0x30
+KIND_RESPONSE = 0x80
+
+SERIALIZER_MASK = 0x0F
+COMPRESSION_MASK = 0x70
+
+SERIALIZERS = {"json": SERIALIZER_JSON, "msgpack": SERIALIZER_MSGPACK}
+COMPRESSIONS = {"none": 0, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD, "lz4": COMPRESSION_LZ4}
+
+VALID_TAGS = frozenset(
+    kind | compression
+    for kind in (*SERIALIZERS.values(), KIND_RESPONSE)
+    for compression in COMPRESSIONS.values()
+)
+
+
+class CacheCodec:
+    """Serializes cache entries with a pluggable encoder and optional compression"""
+
+    def __init__(self, serializer: str = "json", compression: str = "none", compress_min_bytes: int = 1024):
+        """Initialize codec, falling back to json / no compression if a library is missing"""
+        if serializer == "msgpack" and msgpack is None:
+            logger.warning("msgpack not installed, cache serializer falling back to json")
+            serializer = "json"
+        if (compression == "zstd" and zstandard is None) or (compression == "lz4" and lz4_frame is None):
+            logger.warning(f"{compression} not installed, cache compression falling back to zlib")
+            compression = "zlib"
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self._serializer_tag = SERIALIZERS[serializer]
+        self._compression_tag = COMPRESSIONS[compression]
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    @classmethod
+    def from_env(cls) -> "CacheCodec":
+        """Build codec from CACHE_SERIALIZER / CACHE_COMPRESSION / CACHE_COMPRESS_MIN_BYTES"""
+        return cls(
+            serializer=os.getenv("CACHE_SERIALIZER", "json").lower(),
+            compression=os.getenv("CACHE_COMPRESSION", "zstd" if zstandard else "none").lower(),
+            compress_min_bytes=int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 1024)),
+        )
+
+    def encode(self, value: Any, soft_expires_at: float) -> Tuple[bytes, int]:
+        """Encode a value and its soft expiry; returns (stored bytes, uncompressed size)"""
+        if isinstance(value, CachedResponse):
+            tag = KIND_RESPONSE
+            payload = f"{soft_expires_at}\n{value.etag}\n{value.media_type}\n".encode() + value.body
+        else:
+            tag = self._serializer_tag
+            payload = self._serialize([soft_expires_at, value])
+
+        size = len(payload)
+        if self._compression_tag and size >= self.compress_min_bytes:
+            tag |= self._compression_tag
+            payload = self._compress(payload)
+        return bytes([tag]) + payload, size
+
+    def decode(self, raw: bytes) -> Tuple[Any, float, int]:
+        """Decode stored bytes; returns (value, soft_expires_at, uncompressed size)"""
+        tag = raw[0]
+        if tag not in VALID_TAGS:
+            return self._decode_legacy(raw)
+        try:
+            return self._decode_tagged(tag, raw[1:])
+        except Exception:
+            # Some bare legacy JSON values ('"', "1", "2") start with a valid tag byte
+            try:
+                return self._decode_legacy(raw)
+            except ValueError:
+                pass
+            raise
+
+    def _decode_tagged(self, tag: int, payload: bytes) -> Tuple[Any, float, int]:
+        if tag & COMPRESSION_MASK:
+            payload = self._decompress(tag & COMPRESSION_MASK, payload)
+        if tag & KIND_RESPONSE:
+            return self._decode_response(payload) + (len(payload),)
+
+        soft_expires_at, value = self._deserialize(tag & SERIALIZER_MASK, payload)
+        return value, soft_expires_at, len(payload)
+
+    def _decode_legacy(self, raw: bytes) -> Tuple[Any, float, int]:
+        """Entries written before format tags"""
+        if raw.startswith(b"R1\n"):
+            # Untagged response entries: "R1\n" followed by the response header lines
+            return self._decode_response(raw[3:]) + (len(raw),)
+        # Untagged JSON: the {"value", "soft_expires_at"} envelope or a bare value (lists included)
+        data = json.loads(raw)
+        if isinstance(data, dict) and data.keys() == {"value", "soft_expires_at"}:
+            return data["value"], data["soft_expires_at"], len(raw)
+        return data, float("inf"), len(raw)
+
+    @staticmethod
+    def _decode_response(payload: bytes) -> Tuple[CachedResponse, float]:
+        soft_expires_at, etag, media_type, body = payload.split(b"\n", 3)
+        return CachedResponse(body, etag.decode(), media_type.decode()), float(soft_expires_at)
+
+    def _serialize(self, data: Any) -> bytes:
+        if self._serializer_tag == SERIALIZER_MSGPACK:
+            return msgpack.packb(data, use_bin_type=True)
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def _deserialize(serializer_tag: int, payload: bytes) -> Any:
+        if serializer_tag == SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise ValueError("msgpack entry found but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False)
+        if serializer_tag == SERIALIZER_JSON:
+            return orjson.loads(payload) if orjson is not None else json.loads(payload)
+        raise ValueError(f"Unknown cache serializer tag {serializer_tag:#x}")
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self._compression_tag == COMPRESSION_ZSTD:
+            return self._zstd_compressor.compress(payload)
+        if self._compression_tag == COMPRESSION_LZ4:
+            return lz4_frame.compress(payload)
+        return zlib.compress(payload, 6)
+
+    def _decompress(self, compression_tag: int, payload: bytes) -> bytes:
+        if compression_tag == COMPRESSION_ZSTD:
+            if self._zstd_decompressor is None:
+                raise ValueError("zstd entry found but zstandard is not installed")
+            return self._zstd_decompressor.decompress(payload)
+        if compression_tag == COMPRESSION_LZ4:
+            if lz4_frame is None:
+                raise ValueError("lz4 entry found but lz4 is not installed")
+            return lz4_frame.decompress(payload)
+        if compression_tag == COMPRESSION_ZLIB:
+            return zlib.decompress(payload)
+        raise ValueError(f"Unknown cache compression tag {compression_tag:#x}")
+
+
+# Per key family TTLs used by the API endpoints
+CACHE_POLICIES: Dict[str, CachePolicy] = {
+    # Market snapshot (price, market cap, volume, change) from one CoinGecko call
+    "price": CachePolicy.from_env("price", 30, 300),
+    "subnets": CachePolicy.from_env("subnets", 60, 1800),
+    "validators": CachePolicy.from_env("validators", 60, 1800),
+    "emissions": CachePolicy.from_env("emissions", 60, 1800),
+    "market": CachePolicy.from_env("market", 60, 600),
+    # Every subnet's neurons (slimmed for search), refreshed in the background only
+    "neurons": CachePolicy.from_env("neurons", 600, 7200),
+    # Upstream hotkey lookups for keys the local search index does not know
+    "search": CachePolicy.from_env("search", 300, 3600),
+    # Simulation inputs (rebuilt every 5m by ingestion) and results keyed by parameter hash
+    "simulation": CachePolicy.from_env("simulation", 300, 900),
+    # Rebuilt from the component keys above, so it only needs to absorb bursts
+    "dashboard": CachePolicy.from_env("dashboard", 10, 60),
+}
+
+
+class LocalCache:
+    """In-process LRU cache with per-entry TTL and size/memory caps"""
+
+    def __init__(self, max_items: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        """Initialize empty L1 cache"""
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value if present and not expired, marking it recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, size: int):
+        """Store value for ttl seconds, evicting least recently used entries"""
+        if ttl <= 0 or size > self.max_bytes:
+            self.delete(key)
+            return
+
+        self._pop(key)
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self._bytes += size
+        while len(self._entries) > self.max_items or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._pop(oldest)
+
+    def delete(self, key: str):
+        """Drop a single key"""
+        self._pop(key)
+
+    def clear(self):
+        """Drop all entries"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class CacheService:
-    """Redis cache service with JSON serialization"""
-    
+    """Async Redis cache service with JSON serialization and an in-process L1 tier"""
+
     def __init__(self):
-        """Initialize Redis connection"""
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        """Initialize cache configuration (call connect() before use)"""
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.redis_client: Optional[redis.Redis] = None
+        self.instance_id = uuid.uuid4().hex
+        self.l1_max_ttl = float(os.getenv("CACHE_L1_MAX_TTL", 60))
+        self.local = LocalCache(
+            max_items=int(os.getenv("CACHE_L1_MAX_ITEMS", 1024)),
+            max_bytes=int(os.getenv("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024)),
+        )
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.flights = SingleFlight()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self.distributed_lock = os.getenv("CACHE_DISTRIBUTED_LOCK", "true").lower() == "true"
+        # The lock is renewed every third of its TTL while the fetch runs, so
+        # the TTL only bounds how long a crashed holder blocks other workers;
+        # waiters give up (and fetch themselves) after lock_wait
+        self.lock_timeout = float(os.getenv("CACHE_LOCK_TIMEOUT", 15))
+        self.lock_wait = float(os.getenv("CACHE_LOCK_WAIT", 60))
+        self.codec = CacheCodec.from_env()
+        self.tag_ttl = int(os.getenv("CACHE_TAG_TTL", 86400))
+        self.last_good_ttl = int(os.getenv("CACHE_LAST_GOOD_TTL", 86400))
+        # namespace -> (version, monotonic time read); re-read after l1_max_ttl
+        # so a missed pub/sub bump is only served for as long as an L1 value
+        self._namespace_versions: Dict[str, Tuple[int, float]] = {}
+        self._cleanup_tasks: Set[asyncio.Task] = set()
+
+    async def connect(self):
+        """Open the Redis connection pool and start the invalidation listener"""
         try:
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
-            self.redis_client.ping()
+            pool = redis.ConnectionPool.from_url(
+                self.redis_url,
+                max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+                socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", 2)),
+                socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", 2)),
+                health_check_interval=30,
+                decode_responses=False,
+            )
+            self.redis_client = redis.Redis(connection_pool=pool)
+            await self.redis_client.ping()
             logger.info("Redis connection established")
         except Exception as e:
             logger.warning(f"Redis connection failed: {e}. Caching disabled.")
             self.redis_client = None
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Get cached value by key"""
-        if not self.redis_client:
-            return None
-        
+            return
+
+        await self._start_invalidation_listener()
+
+    async def _start_invalidation_listener(self):
+        """Subscribe to invalidation messages from other workers"""
         try:
-            value = self.redis_client.get(key)
-            if value:
-                return json.loads(value)
-            return None
+            self._pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(INVALIDATION_CHANNEL)
+            self._listener_task = asyncio.create_task(self._listen_for_invalidations())
         except Exception as e:
-            logger.error(f"Cache get error for {key}: {e}")
-            return None
-    
-    def set(self, key: str, value: Any, ttl: int = 300) -> bool:
-        """Set cache value with TTL (in seconds)"""
+            # Without invalidation other workers may serve stale L1 data,
+            # so fall back to Redis-only reads
+            logger.warning(f"Cache invalidation listener failed: {e}. L1 cache disabled.")
+            self.local = None
+
+    async def _listen_for_invalidations(self):
+        """Drop keys another worker has changed"""
+        # Checked every poll as well as cancelling, since a cancel that lands inside
+        # get_message's read timeout can be swallowed by the client
+        while not self._closing:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                payload = json.loads(message["data"])
+                if payload.get("origin") == self.instance_id:
+                    continue
+                for key in payload.get("keys", []):
+                    self.local.delete(key)
+                now = time.monotonic()
+                for namespace, version in payload.get("namespaces", {}).items():
+                    self._namespace_versions[namespace] = (version, now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {e}")
+                # Bumps published while we were disconnected are lost; re-read versions
+                self._namespace_versions.clear()
+                await asyncio.sleep(1.0)
+
+    async def _publish_invalidation(self, keys: list, namespaces: Optional[Dict[str, int]] = None):
+        """Tell other workers to drop their L1 copies and cached namespace versions"""
+        if self.local is None:
+            return
+        try:
+            await self.redis_client.publish(
+                INVALIDATION_CHANNEL,
+                json.dumps({
+                    "origin": self.instance_id,
+                    "keys": keys,
+                    "namespaces": namespaces or {},
+                }),
+            )
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error: {e}")
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get cached value by key (stale values are returned until their hard TTL)"""
+        entry = await self._get_entry(key)
+        return entry[0] if entry else None
+
+    async def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Get (value, version) for key, or None
+
+        The version is the entry's soft expiry, fixed when the value was
+        written and the same in every worker, so callers can tell whether a
+        value was rewritten without comparing it (an L1 eviction or a Redis
+        read hands back a new object for the same entry).
+        """
+        return await self._get_entry(key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several cached values in one round trip; missing keys are omitted"""
+        entries = await self._get_entries(keys)
+        return {key: entry[0] for key, entry in entries.items()}
+
+    async def _get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Get (value, soft_expires_at) for key, checking L1 before Redis"""
+        return (await self._get_entries([key])).get(key)
+
+    async def _get_entries(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        """Get (value, soft_expires_at) per key from L1, then one MGET for the rest"""
         if not self.redis_client:
+            return {}
+
+        entries: Dict[str, Tuple[Any, float]] = {}
+        missing: List[str] = []
+        for key in dict.fromkeys(keys):
+            entry = self.local.get(key) if self.local is not None else None
+            if entry is not None:
+                entries[key] = entry
+            else:
+                missing.append(key)
+        if not missing:
+            return entries
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.mget(missing)
+            for key in missing:
+                pipe.pttl(key)
+            raws, *pttls = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache get error for {missing}: {e}")
+            return entries
+
+        for key, raw, pttl in zip(missing, raws, pttls):
+            if not raw:
+                continue
+            try:
+                value, soft_expires_at, size = self.codec.decode(raw)
+            except Exception as e:
+                logger.error(f"Cache decode error for {key}: {e}")
+                continue
+            entries[key] = (value, soft_expires_at)
+            if self.local is not None and pttl and pttl > 0:
+                self.local.set(key, entries[key], min(pttl / 1000, self.l1_max_ttl), size)
+        return entries
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = 300,
+        soft_ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """Set cache value with TTL (in seconds)
+
+        soft_ttl marks when the value becomes stale for get_or_fetch; it stays
+        readable until ttl expires. Defaults to ttl. Tagged keys can later be
+        dropped together with invalidate_tags.
+        """
+        return await self.set_many({key: value}, ttl=ttl, soft_ttl=soft_ttl, tags=tags)
+
+    async def set_many(
+        self,
+        values: Dict[str, Any],
+        ttl: int = 300,
+        soft_ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+        last_good: bool = False,
+    ) -> bool:
+        """Set several cache values in one pipelined round trip
+
+        policies optionally overrides ttl/soft_ttl per key with that key's
+        CachePolicy (hard TTL as ttl, soft TTL as soft_ttl). With last_good, a
+        Redis-only copy is also kept for CACHE_LAST_GOOD_TTL as the fallback
+        for failed fetches.
+        """
+        if not self.redis_client or not values:
             return False
-        
+
         try:
-            self.redis_client.setex(
-                key,
-                ttl,
-                json.dumps(value)
-            )
+            tags = list(tags or ())
+            now = time.time()
+            pipe = self.redis_client.pipeline(transaction=False)
+            local_entries = []
+            for key, value in values.items():
+                policy = policies.get(key) if policies else None
+                key_ttl = policy.hard_ttl if policy else ttl
+                key_soft_ttl = policy.soft_ttl if policy else soft_ttl
+                soft_expires_at = now + (key_soft_ttl if key_soft_ttl is not None else key_ttl)
+                raw, size = self.codec.encode(value, soft_expires_at)
+                pipe.setex(key, key_ttl, raw)
+                if last_good:
+                    pipe.setex(f"{LAST_GOOD_PREFIX}{key}", max(key_ttl, self.last_good_ttl), raw)
+                for tag in tags:
+                    pipe.sadd(f"{TAG_PREFIX}{tag}", key)
+                    pipe.expire(f"{TAG_PREFIX}{tag}", max(key_ttl, self.tag_ttl))
+                local_entries.append((key, (value, soft_expires_at), key_ttl, size))
+            await pipe.execute()
+
+            if self.local is not None:
+                for key, entry, key_ttl, size in local_entries:
+                    self.local.set(key, entry, min(key_ttl, self.l1_max_ttl), size)
+                await self._publish_invalidation(list(values))
             return True
         except Exception as e:
-            logger.error(f"Cache set error for {key}: {e}")
+            logger.error(f"Cache set error for {list(values)}: {e}")
             return False
-    
-    def delete(self, key: str) -> bool:
+
+    async def delete(self, key: str) -> bool:
         """Delete cache key"""
         if not self.redis_client:
             return False
-        
+
         try:
-            self.redis_client.delete(key)
+            await self.redis_client.delete(key)
+            if self.local is not None:
+                self.local.delete(key)
+                await self._publish_invalidation([key])
             return True
         except Exception as e:
             logger.error(f"Cache delete error for {key}: {e}")
             return False
-    
-    def clear_pattern(self, pattern: str) -> int:
-        """Clear all keys matching pattern"""
+
+    async def clear_pattern(self, pattern: str) -> int:
+        """Clear all keys matching pattern
+
+        Walks the keyspace incrementally with SCAN so Redis is never blocked;
+        prefer invalidate_tags or bump_namespace for routine invalidation.
+        """
         if not self.redis_client:
             return 0
-        
+
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            deleted = 0
+            batch: List[str] = []
+            async for key in self.redis_client.scan_iter(match=pattern, count=BATCH_SIZE):
+                batch.append(key.decode())
+                if len(batch) >= BATCH_SIZE:
+                    deleted += await self._unlink(batch)
+                    batch = []
+            if batch:
+                deleted += await self._unlink(batch)
+            return deleted
         except Exception as e:
             logger.error(f"Cache clear pattern error for {pattern}: {e}")
             return 0
-    
-    def close(self):
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Drop every key stored with any of the given tags"""
+        if not self.redis_client or not tags:
+            return 0
+
+        try:
+            tag_keys = [f"{TAG_PREFIX}{tag}" for tag in tags]
+            pipe = self.redis_client.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+
+            keys = sorted({key.decode() for tag_members in members for key in tag_members})
+            deleted = 0
+            for i in range(0, len(keys), BATCH_SIZE):
+                deleted += await self._unlink(keys[i:i + BATCH_SIZE])
+            await self.redis_client.unlink(*tag_keys)
+            return deleted
+        except Exception as e:
+            logger.error(f"Cache tag invalidation error for {tags}: {e}")
+            return 0
+
+    async def _unlink(self, keys: List[str]) -> int:
+        """Unlink a batch of keys in Redis and drop them from every worker's L1"""
+        deleted = await self.redis_client.unlink(*keys)
+        if self.local is not None:
+            for key in keys:
+                self.local.delete(key)
+            await self._publish_invalidation(keys)
+        return deleted
+
+    async def namespaced_key(self, namespace: str, key: str) -> str:
+        """Prefix key with the namespace's current version
+
+        Bumping the namespace version makes every key built from the old version
+        unreachable at once. The version is kept locally for at most l1_max_ttl.
+        """
+        cached = self._namespace_versions.get(namespace)
+        if cached is not None and time.monotonic() - cached[1] < self.l1_max_ttl:
+            version = cached[0]
+        else:
+            version = 0
+            if self.redis_client:
+                try:
+                    raw = await self.redis_client.get(f"{NAMESPACE_PREFIX}{namespace}")
+                    version = int(raw) if raw else 0
+                except Exception as e:
+                    logger.error(f"Cache namespace lookup error for {namespace}: {e}")
+                    return f"{namespace}:v0:{key}"
+            # Versions are only safe to keep locally while bumps reach us over pub/sub
+            if self.local is not None:
+                self._namespace_versions[namespace] = (version, time.monotonic())
+        return f"{namespace}:v{version}:{key}"
+
+    async def bump_namespace(self, namespace: str, cleanup: bool = True) -> int:
+        """Invalidate a whole key family in O(1) by incrementing its version
+
+        With cleanup, keys under the previous version are removed in the
+        background with SCAN instead of waiting for their TTLs.
+        """
+        if not self.redis_client:
+            return 0
+
+        try:
+            version = await self.redis_client.incr(f"{NAMESPACE_PREFIX}{namespace}")
+        except Exception as e:
+            logger.error(f"Cache namespace bump error for {namespace}: {e}")
+            return 0
+
+        if self.local is not None:
+            self._namespace_versions[namespace] = (version, time.monotonic())
+            await self._publish_invalidation([], {namespace: version})
+
+        if cleanup:
+            task = asyncio.ensure_future(self.clear_pattern(f"{namespace}:v{version - 1}:*"))
+            self._cleanup_tasks.add(task)
+            task.add_done_callback(self._cleanup_tasks.discard)
+        return version
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]] = None,
+        allow_stale: bool = True,
+    ) -> Any:
+        """Get cached value, or fetch it once for all concurrent callers and cache it
+
+        Stale values (past the policy's soft TTL) are returned immediately while a
+        single background task refreshes them. With allow_stale=False they are
+        refetched (still once for all callers) before returning.
+        """
+        values = await self.get_or_fetch_many({key: (fetch, policy)}, tags=tags, allow_stale=allow_stale)
+        return values[key]
+
+    async def get_or_fetch_entry(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Tuple[Any, Optional[float]]:
+        """Like get_or_fetch, but returns (value, version) as get_entry does
+
+        The version is None only when the fetched value could not be cached.
+        """
+        entry = await self._get_entry(key)
+        if entry is not None:
+            if entry[1] <= time.time():
+                self._schedule_refresh(key, fetch, policy, list(tags or ()))
+            return entry
+
+        value = await self.get_or_fetch(key, fetch, policy, tags)
+        # Read back what was cached so the value and its version belong together
+        entry = await self._get_entry(key)
+        return entry if entry is not None else (value, None)
+
+    async def get_or_fetch_many(
+        self,
+        specs: Dict[str, Tuple[Callable[[], Awaitable[Any]], CachePolicy]],
+        tags: Optional[Iterable[str]] = None,
+        allow_stale: bool = True,
+        key_tags: Optional[Dict[str, Iterable[str]]] = None,
+        return_exceptions: bool = False,
+    ) -> Dict[str, Any]:
+        """Batched get_or_fetch for {key: (fetch, policy)}
+
+        Reads every key in one round trip, then fetches only the missing (or, with
+        allow_stale=False, stale) keys concurrently, each coalesced with any other
+        in-flight fetch of the same key. key_tags adds per-key tags to tags. With
+        return_exceptions, a failed fetch yields its exception as that key's value
+        instead of failing the whole batch.
+        """
+        def tags_for(key: str) -> List[str]:
+            return list(tags or ()) + list((key_tags or {}).get(key, ()))
+
+        entries = await self._get_entries(specs)
+        now = time.time()
+        values: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key, (fetch, policy) in specs.items():
+            entry = entries.get(key)
+            if entry is None or (not allow_stale and entry[1] <= now):
+                missing.append(key)
+                continue
+            values[key] = entry[0]
+            if entry[1] <= now:
+                self._schedule_refresh(key, fetch, policy, tags_for(key))
+
+        if missing:
+            results = await asyncio.gather(
+                *(
+                    self.flights.do(
+                        key,
+                        lambda key=key: self._fetch_and_cache(key, *specs[key], tags_for(key), allow_stale),
+                    )
+                    for key in missing
+                ),
+                return_exceptions=return_exceptions,
+            )
+            values.update(zip(missing, results))
+        return values
+
+    async def get_or_fetch_response(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]] = None,
+    ) -> CachedResponse:
+        """Like get_or_fetch, but caches the encoded response body instead of the value
+
+        Hits return the stored bytes and ETag without decoding or re-encoding JSON.
+        """
+        async def fetch_response() -> CachedResponse:
+            return CachedResponse.from_payload(await fetch())
+
+        return await self.get_or_fetch(f"response:{key}", fetch_response, policy, tags)
+
+    def _schedule_refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]],
+    ):
+        """Start a background refresh for key unless one is already running here"""
+        if self.flights.in_flight(key):
+            return
+        task = asyncio.ensure_future(self.flights.do(key, lambda: self._refresh(key, fetch, policy, tags)))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refresh_tasks.discard(task)
+        # Errors are logged in _refresh; retrieve them so asyncio does not warn
+        if not task.cancelled():
+            task.exception()
+
+    async def _refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]],
+    ) -> Any:
+        """Refresh a stale key, skipping the fetch if another worker is already refreshing
+
+        Callers that join this flight get the refreshed value, or the current
+        stale one if the refresh is skipped or fails.
+        """
+        token = await self._acquire_fetch_lock(key, wait=False)
+        if token is None and self.redis_client and self.distributed_lock:
+            cached = await self.get(key)
+            if cached is not None:
+                return cached
+            return await self._fetch_and_cache(key, fetch, policy, tags)
+
+        try:
+            value = await self._fetch_holding_lock(key, token, fetch)
+            await self.put(key, value, policy, tags)
+            return value
+        except Exception as e:
+            logger.error(f"Cache background refresh error for {key}: {e}")
+            cached = await self.get(key)
+            if cached is not None:
+                return cached
+            cached = await self._serve_last_good(key, policy, tags)
+            if cached is None:
+                raise
+            return cached
+        finally:
+            if token:
+                await self._release_fetch_lock(key, token)
+
+    async def _fetch_and_cache(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]],
+        allow_stale: bool = True,
+    ) -> Any:
+        """Fetch and cache a value, coordinating with other workers via a Redis lock"""
+        token = await self._acquire_fetch_lock(key)
+        try:
+            # A previous flight, or another worker holding the lock while we
+            # waited, may have filled the key since our miss
+            entry = await self._get_entry(key)
+            if entry is not None and (allow_stale or entry[1] > time.time()):
+                return entry[0]
+
+            try:
+                value = await self._fetch_holding_lock(key, token, fetch)
+            except Exception as e:
+                if entry is not None:
+                    logger.warning(f"Cache fetch error for {key}, serving stale value: {e}")
+                    return entry[0]
+                cached = await self._serve_last_good(key, policy, tags)
+                if cached is None:
+                    raise
+                logger.warning(f"Cache fetch error for {key}, serving last known good value: {e}")
+                return cached
+
+            await self.put(key, value, policy, tags)
+            return value
+        finally:
+            if token:
+                await self._release_fetch_lock(key, token)
+
+    async def put(
+        self,
+        key: str,
+        value: Any,
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """Cache a freshly fetched value under its policy, keeping it as the last known good
+        unless it is an error placeholder"""
+        return await self.set_many(
+            {key: value},
+            ttl=policy.hard_ttl,
+            soft_ttl=policy.soft_ttl,
+            tags=tags,
+            last_good=not is_error_payload(value),
+        )
+
+    async def put_response(
+        self,
+        key: str,
+        payload: Any,
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """Cache a freshly fetched payload in the form read by get_or_fetch_response"""
+        return await self.put(f"response:{key}", CachedResponse.from_payload(payload), policy, tags)
+
+    async def _serve_last_good(
+        self,
+        key: str,
+        policy: CachePolicy,
+        tags: Optional[Iterable[str]],
+    ) -> Optional[Any]:
+        """Get the last successfully fetched value for key after a failed fetch
+
+        The value is written back as already stale (for up to the soft TTL), so
+        other callers are served it directly while background refreshes keep
+        retrying the upstream.
+        """
+        if not self.redis_client:
+            return None
+
+        try:
+            raw = await self.redis_client.get(f"{LAST_GOOD_PREFIX}{key}")
+            if not raw:
+                return None
+            value = self.codec.decode(raw)[0]
+        except Exception as e:
+            logger.error(f"Cache last known good lookup error for {key}: {e}")
+            return None
+
+        await self.set(key, value, ttl=max(policy.soft_ttl, 1), soft_ttl=0, tags=tags)
+        return value
+
+    async def _acquire_fetch_lock(self, key: str, wait: bool = True) -> Optional[str]:
+        """Take the cross-worker fetch lock for key, waiting while another worker holds it
+
+        Returns the lock token, or None if the lock was not taken (disabled, Redis
+        unavailable, held elsewhere with wait=False, or still held elsewhere when
+        the wait timed out).
+        """
+        if not self.redis_client or not self.distributed_lock:
+            return None
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        try:
+            while time.monotonic() < deadline:
+                if await self.redis_client.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+                    return token
+                if not wait:
+                    return None
+                await asyncio.sleep(0.05)
+        except Exception as e:
+            logger.error(f"Cache lock error for {key}: {e}")
+        return None
+
+    async def _fetch_holding_lock(
+        self,
+        key: str,
+        token: Optional[str],
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Run fetch, renewing the fetch lock until it finishes
+
+        A guarded fetch can outlast lock_timeout (retries with backoff, rate
+        limiter waits, several upstream calls); without renewal the lock would
+        expire mid-fetch and let another worker start the same fetch.
+        """
+        if not token:
+            return await fetch()
+
+        renewal = asyncio.create_task(self._renew_fetch_lock(key, token))
+        try:
+            return await fetch()
+        finally:
+            renewal.cancel()
+
+    async def _renew_fetch_lock(self, key: str, token: str):
+        """Extend the fetch lock every third of its TTL while we still own it"""
+        ttl_ms = int(self.lock_timeout * 1000)
+        while True:
+            await asyncio.sleep(self.lock_timeout / 3)
+            try:
+                if not await self.redis_client.eval(RENEW_LOCK_SCRIPT, 1, f"lock:{key}", token, ttl_ms):
+                    return
+            except Exception as e:
+                logger.error(f"Cache lock renewal error for {key}: {e}")
+
+    async def _release_fetch_lock(self, key: str, token: str):
+        """Release the fetch lock if we still own it"""
+        try:
+            await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+        except Exception as e:
+            logger.error(f"Cache lock release error for {key}: {e}")
+
+    async def close(self):
         """Close Redis connection"""
+        self._closing = True
+        if self._listener_task:
+            self._listener_task.cancel()
+            await asyncio.wait([self._listener_task], timeout=2.0)
+        if self._pubsub:
+            try:
+                await self._pubsub.aclose()
+            except Exception as e:
+                logger.error(f"Error closing cache invalidation listener: {e}")
         if self.redis_client:
             try:
-                self.redis_client.close()
+                await self.redis_client.aclose()
                 logger.info("Redis connection closed")
             except Exception as e:
                 logger.error(f"Error closing Redis: {e}")
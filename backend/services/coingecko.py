@@ -6,95 +6,175 @@ Fetches live cryptocurrency data
 import httpx
 import asyncio
 import logging
-from typing import Dict, Any
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.resilience import UpstreamError, UpstreamGuard
+from services.upstream import COINGECKO_UPSTREAM, create_upstream_client
 
 logger = logging.getLogger(__name__)
 
+class MarketSnapshot:
+    """Price and market data for one coin in one currency, from a single /simple/price call"""
+    
+    FIELDS = ("coin", "currency", "price", "market_cap", "rank", "volume_24h", "change_24h", "timestamp", "error")
+    
+    def __init__(self, coin: str, currency: str, price=None, market_cap=None, rank=None,
+                 volume_24h=None, change_24h=None, timestamp=None, error=None):
+        """Initialize snapshot"""
+        self.coin = coin
+        self.currency = currency
+        self.price = price
+        self.market_cap = market_cap
+        self.rank = rank
+        self.volume_24h = volume_24h
+        self.change_24h = change_24h
+        self.timestamp = timestamp
+        self.error = error
+    
+    @classmethod
+    def from_simple_price(cls, coin: str, currency: str, data: Dict[str, Any], timestamp: float) -> "MarketSnapshot":
+        """Build from one coin's entry in a /simple/price response"""
+        return cls(
+            coin=coin,
+            currency=currency,
+            price=data.get(currency),
+            market_cap=data.get(f"{currency}_market_cap"),
+            rank=data.get(f"{currency}_market_cap_rank"),
+            volume_24h=data.get(f"{currency}_24h_vol"),
+            change_24h=data.get(f"{currency}_24h_change"),
+            timestamp=timestamp,
+        )
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MarketSnapshot":
+        """Rebuild from to_dict() output (e.g. a cached snapshot)"""
+        return cls(**{field: data.get(field) for field in cls.FIELDS})
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form for caching"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+    
+    def price_data(self) -> Dict[str, Any]:
+        """Shape served by /api/tao/price"""
+        if self.error:
+            return {"price": None, "marketCap": None, "volume24h": None, "change24h": None, "error": self.error}
+        return {
+            "price": self.price,
+            "marketCap": self.market_cap,
+            "volume24h": self.volume_24h,
+            "change24h": self.change_24h,
+            "timestamp": self.timestamp,
+        }
+    
+    def marketcap_data(self) -> Dict[str, Any]:
+        """Shape served by /api/tao/marketcap"""
+        if self.error:
+            return {"error": self.error}
+        return {
+            "marketCap": self.market_cap,
+            "rank": self.rank,
+            "price": self.price,
+        }
+
 class CoinGeckoService:
     """CoinGecko API integration for cryptocurrency data"""
     
-    def __init__(self):
-        """Initialize CoinGecko service"""
-        self.base_url = "https://api.coingecko.com/api/v3"
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, guard: Optional[UpstreamGuard] = None):
+        """Initialize CoinGecko service with a shared pooled client and upstream guard
+        
+        Methods raise UpstreamError when CoinGecko is unavailable so callers can
+        fall back to cached data.
+        """
+        self.client = client or create_upstream_client(COINGECKO_UPSTREAM)
+        self.guard = guard or UpstreamGuard.from_config(COINGECKO_UPSTREAM)
         self.tao_id = "bittensor"
     
-    async def get_tao_price(self) -> Dict[str, Any]:
-        """Get current TAO (Bittensor) price in USD"""
+    async def get_market_snapshots(
+        self,
+        coin_ids: List[str],
+        currencies: List[str] = ("usd",),
+    ) -> Dict[str, Dict[str, MarketSnapshot]]:
+        """Get price, market cap, rank, volume and 24h change for several coins and
+        currencies in one request, as {coin: {currency: MarketSnapshot}}"""
+        response = await self.guard.get(
+            self.client,
+            "/simple/price",
+            params={
+                "ids": ",".join(coin_ids),
+                "vs_currencies": ",".join(currencies),
+                "include_market_cap": "true",
+                "include_market_cap_rank": "true",
+                "include_24hr_vol": "true",
+                "include_24hr_change": "true",
+            },
+        )
+        data = response.json()
+        
+        timestamp = asyncio.get_event_loop().time()
+        return {
+            coin: {
+                currency: MarketSnapshot.from_simple_price(coin, currency, data.get(coin, {}), timestamp)
+                for currency in currencies
+            }
+            for coin in coin_ids
+        }
+    
+    async def get_tao_snapshot(self) -> Dict[str, Any]:
+        """Get consolidated TAO market snapshot in USD (cacheable dict form)"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/simple/price",
-                    params={
-                        "ids": self.tao_id,
-                        "vs_currencies": "usd",
-                        "include_market_cap": "true",
-                        "include_24hr_vol": "true",
-                        "include_24hr_change": "true",
-                    },
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                bittensor = data.get(self.tao_id, {})
-                return {
-                    "price": bittensor.get("usd"),
-                    "marketCap": bittensor.get("usd_market_cap"),
-                    "volume24h": bittensor.get("usd_24h_vol"),
-                    "change24h": bittensor.get("usd_24h_change"),
-                    "timestamp": asyncio.get_event_loop().time(),
-                }
+            snapshots = await self.get_market_snapshots([self.tao_id], ["usd"])
+            return snapshots[self.tao_id]["usd"].to_dict()
         except Exception as e:
-            logger.error(f"Error fetching TAO price: {e}")
-            return {
-                "price": None,
-                "marketCap": None,
-                "volume24h": None,
-                "change24h": None,
-                "error": str(e),
-            }
+            logger.error(f"Error fetching TAO market snapshot: {e}")
+            if isinstance(e, UpstreamError):
+                raise
+            return MarketSnapshot(self.tao_id, "usd", error=str(e)).to_dict()
+    
+    async def get_tao_price(self) -> Dict[str, Any]:
+        """Get current TAO (Bittensor) price in USD"""
+        return MarketSnapshot.from_dict(await self.get_tao_snapshot()).price_data()
     
     async def get_tao_marketcap(self) -> Dict[str, Any]:
         """Get TAO market cap data"""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/simple/price",
-                    params={
-                        "ids": self.tao_id,
-                        "vs_currencies": "usd",
-                        "include_market_cap": "true",
-                        "include_market_cap_rank": "true",
-                    },
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                bittensor = data.get(self.tao_id, {})
-                return {
-                    "marketCap": bittensor.get("usd_market_cap"),
-                    "rank": bittensor.get("usd_market_cap_rank"),
-                    "price": bittensor.get("usd"),
-                }
-        except Exception as e:
-            logger.error(f"Error fetching TAO market cap: {e}")
-            return {"error": str(e)}
+        return MarketSnapshot.from_dict(await self.get_tao_snapshot()).marketcap_data()
+    
+    async def get_price_range(self, start: datetime, end: datetime) -> List[Tuple[datetime, float]]:
+        """Get TAO/USD price samples between two naive UTC datetimes, oldest first
+        
+        CoinGecko picks the granularity: 5-minutely up to a day, hourly up to
+        90 days, daily beyond. Raises on upstream errors.
+        """
+        epoch = datetime(1970, 1, 1)
+        response = await self.guard.get(
+            self.client,
+            f"/coins/{self.tao_id}/market_chart/range",
+            params={
+                "vs_currency": "usd",
+                "from": int((start - epoch).total_seconds()),
+                "to": int((end - epoch).total_seconds()),
+            },
+        )
+        return [
+            (epoch + timedelta(milliseconds=timestamp_ms), price)
+            for timestamp_ms, price in response.json().get("prices", [])
+            if price is not None
+        ]
     
     async def get_historical_price(self, days: int = 30) -> Dict[str, Any]:
         """Get historical price data"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/coins/{self.tao_id}/market_chart",
-                    params={
-                        "vs_currency": "usd",
-                        "days": days,
-                    },
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(
+                self.client,
+                f"/coins/{self.tao_id}/market_chart",
+                params={
+                    "vs_currency": "usd",
+                    "days": days,
+                },
+            )
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching historical price: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return {"error": str(e)}
@@ -1,14 +1,24 @@
 """
 Database Service
-PostgreSQL integration with SQLAlchemy
+PostgreSQL integration with SQLAlchemy (asyncio, asyncpg driver)
 """
 
 import os
+import base64
+import hashlib
+import json
 import logging
-from sqlalchemy import create_engine, Column, String, Float, DateTime, Integer
+import time
+import numpy as np
+from sqlalchemy import Column, String, Float, DateTime, Integer, BigInteger, Index, and_, any_, bindparam, case, cast, column, delete, func, insert, inspect, or_, select, text, update, values
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from sqlalchemy.orm import aliased
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.accrual import CHUNK_SIZE, UPDATE_BATCH, accrue
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +50,9 @@ class AuthUser(Base):
 class StakingPosition(Base):
     """Staking position model"""
     __tablename__ = "staking_positions"
+    __table_args__ = (
+        Index("ix_staking_positions_user_status", "user_address", "status"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_address = Column(String, nullable=False)
@@ -50,6 +63,7 @@ class StakingPosition(Base):
     status = Column(String, default="active")  # active, inactive, completed
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    accrued_at = Column(DateTime, nullable=True)  # earnings accrued up to (created_at until the first run)
 
 class Transaction(Base):
     """Transaction history model"""
@@ -63,10 +77,37 @@ class Transaction(Base):
     hash = Column(String, nullable=True)
     status = Column(String, default="pending")  # pending, confirmed, failed
     timestamp = Column(DateTime, default=datetime.utcnow)
+    
+    # History pages are read newest first per address, resuming from a (timestamp, id) cursor
+    __table_args__ = (
+        Index("ix_transactions_user_timestamp_id", user_address, timestamp.desc(), id),
+    )
+
+class PortfolioSummary(Base):
+    """Running staking totals per address and subnet
+    
+    Updated additively in the same transaction as every position and
+    transaction insert, so a wallet's portfolio is read from at most one row
+    per subnet instead of aggregating all its positions.
+    """
+    __tablename__ = "portfolio_summaries"
+    
+    user_address = Column(String, primary_key=True)
+    subnet_id = Column(Integer, primary_key=True)
+    staked = Column(Float, nullable=False, default=0.0)  # sum of active position amounts
+    apy_weight = Column(Float, nullable=False, default=0.0)  # sum of amount * apy over active positions
+    earnings = Column(Float, nullable=False, default=0.0)  # sum of position earnings
+    positions = Column(Integer, nullable=False, default=0)  # active positions
+    transactions = Column(Integer, nullable=False, default=0)
+    harvested = Column(Float, nullable=False, default=0.0)  # harvest transactions that did not fail
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 class SubnetSnapshot(Base):
-    """Subnet data snapshots for historical tracking"""
+    """Subnet data snapshots for historical tracking (one row per subnet per snapshot interval)"""
     __tablename__ = "subnet_snapshots"
+    __table_args__ = (
+        Index("ix_subnet_snapshots_subnet_timestamp", "subnet_id", "timestamp", unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     subnet_id = Column(Integer, nullable=False)
@@ -75,169 +116,1019 @@ class SubnetSnapshot(Base):
     total_neurons = Column(Integer, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+class PriceCandle(Base):
+    """TAO/USD OHLC candle at one rollup resolution
+    
+    The (resolution, bucket) primary key makes every chart query a single
+    index range scan.
+    """
+    __tablename__ = "price_candles"
+    
+    resolution = Column(String, primary_key=True)  # 1m, 1h, 1d
+    bucket = Column(DateTime, primary_key=True)  # bucket start (UTC)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    first_ts = Column(DateTime, nullable=False)  # time of the open sample
+    last_ts = Column(DateTime, nullable=False)  # time of the close sample
+
+class IngestionMark(Base):
+    """How far an incremental ingestion has fetched, advanced in the same transaction as its data"""
+    __tablename__ = "ingestion_marks"
+    
+    name = Column(String, primary_key=True)
+    value = Column(DateTime, nullable=False)
+
+# IngestionMark of the CoinGecko price backfill (live market samples do not move it)
+PRICE_BACKFILL_MARK = "price_backfill"
+
+class SchemaVersion(Base):
+    """Fingerprint of the schema the startup migrations last brought the database to"""
+    __tablename__ = "schema_version"
+    
+    fingerprint = Column(String, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+# Initial values of columns added to existing tables, run once when the column is added
+COLUMN_BACKFILLS = {
+    ("staking_positions", "accrued_at"): lambda: (
+        update(StakingPosition.__table__)
+        .where(StakingPosition.accrued_at.is_(None))
+        .values(accrued_at=StakingPosition.created_at)
+    ),
+}
+
+# Bump when a startup data migration changes without the tables changing
+MIGRATION_REVISION = 1
+
+# pg_advisory_lock key held while one worker runs the startup migrations
+MIGRATION_LOCK_KEY = 0x6465616930
+
+def schema_fingerprint() -> str:
+    """Hash of every model's columns, types and indexes plus MIGRATION_REVISION"""
+    parts = [f"revision:{MIGRATION_REVISION}"]
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts += [f"{c.name}:{c.type}:{c.nullable}" for c in table.columns]
+        parts += sorted(index.name for index in table.indexes)
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+# Rollup resolutions: name -> (bucket width, retention or None to keep forever)
+PRICE_RESOLUTIONS: Dict[str, Tuple[timedelta, Optional[timedelta]]] = {
+    "1m": (timedelta(minutes=1), timedelta(days=int(os.getenv("PRICE_1M_RETENTION_DAYS", 7)))),
+    "1h": (timedelta(hours=1), timedelta(days=int(os.getenv("PRICE_1H_RETENTION_DAYS", 730)))),
+    "1d": (timedelta(days=1), None),
+}
+
+def price_bucket(timestamp: datetime, width: timedelta) -> datetime:
+    """Start of the bucket containing timestamp"""
+    seconds = int(width.total_seconds())
+    epoch = int((timestamp - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % seconds)
+
+def fold_candles(points: List[Tuple[datetime, float]], width: timedelta) -> List[Dict[str, Any]]:
+    """price_candles rows (without resolution) for time-sorted samples, one per bucket"""
+    candles: Dict[datetime, Dict[str, Any]] = {}
+    for timestamp, price in points:
+        bucket = price_bucket(timestamp, width)
+        candle = candles.get(bucket)
+        if candle is None:
+            candles[bucket] = {
+                "bucket": bucket, "open": price, "high": price, "low": price, "close": price,
+                "first_ts": timestamp, "last_ts": timestamp,
+            }
+        else:
+            candle["high"] = max(candle["high"], price)
+            candle["low"] = min(candle["low"], price)
+            candle["close"], candle["last_ts"] = price, timestamp
+    return list(candles.values())
+
+# Additive PortfolioSummary columns
+SUMMARY_COLUMNS = ("staked", "apy_weight", "earnings", "positions", "transactions", "harvested")
+
+def position_contribution(position: Dict[str, Any]) -> Tuple[str, int, Dict[str, float]]:
+    """What one inserted position adds to its portfolio summary row"""
+    active = position["status"] == "active"
+    return position["user_address"], position["subnet_id"], {
+        "staked": position["amount"] if active else 0.0,
+        "apy_weight": position["amount"] * position["apy"] if active else 0.0,
+        "earnings": position["earnings"],
+        "positions": int(active),
+    }
+
+def transaction_contribution(transaction: Dict[str, Any]) -> Tuple[str, int, Dict[str, float]]:
+    """What one inserted transaction adds to its portfolio summary row"""
+    harvested = transaction["transaction_type"] == "harvest" and transaction["status"] != "failed"
+    return transaction["user_address"], transaction["subnet_id"], {
+        "transactions": 1,
+        "harvested": transaction["amount"] if harvested else 0.0,
+    }
+
+def summary_deltas(contributions: Iterable[Tuple[str, int, Dict[str, float]]]) -> List[Dict[str, Any]]:
+    """Sum contributions into one PortfolioSummary delta row per (address, subnet), in key order"""
+    now = datetime.utcnow()
+    totals = {}
+    for address, subnet_id, delta in contributions:
+        row = totals.get((address, subnet_id))
+        if row is None:
+            row = {"user_address": address, "subnet_id": subnet_id, "updated_at": now}
+            row.update(dict.fromkeys(SUMMARY_COLUMNS, 0))
+            totals[(address, subnet_id)] = row
+        for column, value in delta.items():
+            row[column] += value
+    # Sorted so concurrent writers lock summary rows in the same order
+    return [totals[key] for key in sorted(totals)]
+
+def position_dict(p: StakingPosition) -> Dict[str, Any]:
+    """API shape of a staking position"""
+    return {
+        "id": p.id,
+        "subnet_id": p.subnet_id,
+        "amount": p.amount,
+        "apy": p.apy,
+        "earnings": p.earnings,
+        "status": p.status,
+        "created_at": p.created_at.isoformat(),
+    }
+
+def transaction_dict(t: Transaction) -> Dict[str, Any]:
+    """API shape of a transaction"""
+    return {
+        "id": t.id,
+        "type": t.transaction_type,
+        "subnet_id": t.subnet_id,
+        "amount": t.amount,
+        "status": t.status,
+        "timestamp": t.timestamp.isoformat(),
+        "hash": t.hash,
+    }
+
+class InvalidCursor(ValueError):
+    """Malformed transaction history cursor"""
+
+def encode_history_cursor(transaction: Dict[str, Any]) -> str:
+    """Cursor resuming history after this transaction (as returned by get_user_transaction_history)"""
+    return base64.urlsafe_b64encode(json.dumps([transaction["timestamp"], transaction["id"]]).encode()).decode()
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(timestamp, id) of the last transaction on the previous page"""
+    try:
+        timestamp, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(transaction_id)
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
 # ============================================
 # DATABASE SERVICE
 # ============================================
 
+# Sync driver URLs mapped to their asyncio drivers
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """Rewrite a DATABASE_URL to use an asyncio driver (postgresql:// -> postgresql+asyncpg://)"""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
 class Database:
-    """Database service for PostgreSQL operations"""
+    """Database service for PostgreSQL operations (all queries are awaitable)"""
     
     def __init__(self):
-        """Initialize database connection"""
-        db_url = os.getenv(
+        """Initialize database configuration (call connect() before use)"""
+        self.db_url = async_database_url(os.getenv(
             "DATABASE_URL",
             "postgresql://localhost/deai_db"
-        )
+        ))
+        self.engine = None
+        self.SessionLocal: Optional[async_sessionmaker] = None
+    
+    async def connect(self):
+        """Create the async engine and pool, then migrate the schema if it changed"""
+        options = {}
+        if not self.db_url.startswith("sqlite"):
+            # Requests beyond pool_size + max_overflow wait up to pool_timeout
+            options = {
+                "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+                "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+                "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+            }
         
         try:
-            self.engine = create_engine(
-                db_url,
+            self.engine = create_async_engine(
+                self.db_url,
                 echo=os.getenv("ENV") == "development",
                 pool_pre_ping=True,
+                **options,
             )
-            self.SessionLocal = sessionmaker(bind=self.engine)
+            self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False)
             
-            # Create tables
-            Base.metadata.create_all(self.engine)
+            await self._migrate()
             logger.info("Database connection established")
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
+            if self.engine:
+                await self.engine.dispose()
             self.engine = None
             self.SessionLocal = None
     
-    def get_session(self):
-        """Get database session"""
+    async def _migrate(self):
+        """Bring the schema up to the models once, not in every worker on every startup
+        
+        When schema_version already holds the current fingerprint nothing runs.
+        Otherwise one worker at a time (a PostgreSQL advisory lock; others wait
+        and then find the fingerprint recorded) creates new tables, adds
+        missing columns and indexes, backfills the portfolio summaries and
+        records the fingerprint.
+        """
+        fingerprint = schema_fingerprint()
+        if await self._schema_is(fingerprint):
+            return
+        
+        async with self.engine.connect() as lock:
+            if self.engine.dialect.name == "postgresql":
+                await lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            try:
+                if await self._schema_is(fingerprint):
+                    return
+                async with self.engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                migrated = await self._add_missing_columns()
+                migrated &= await self._create_missing_indexes()
+                migrated &= await self._backfill_portfolio_summaries()
+                if migrated:
+                    async with self.engine.begin() as conn:
+                        await conn.execute(delete(SchemaVersion))
+                        await conn.execute(insert(SchemaVersion).values(fingerprint=fingerprint))
+                    logger.info(f"Database schema migrated to {fingerprint}")
+            finally:
+                if self.engine.dialect.name == "postgresql":
+                    await lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                await lock.commit()
+    
+    async def _schema_is(self, fingerprint: str) -> bool:
+        """Whether schema_version records fingerprint (False before it exists)"""
+        try:
+            async with self.engine.connect() as conn:
+                return await conn.scalar(
+                    select(SchemaVersion.fingerprint).where(SchemaVersion.fingerprint == fingerprint)
+                ) is not None
+        except Exception:
+            return False
+    
+    async def _add_missing_columns(self) -> bool:
+        """Add nullable columns declared on the models that an existing table lacks
+        
+        create_all never alters existing tables, so columns added to a model
+        later are applied here, then initialised from COLUMN_BACKFILLS in the
+        same transaction. A failure is logged and left for the next startup
+        (returns False).
+        """
+        def missing_columns(conn):
+            inspector = inspect(conn)
+            tables = set(inspector.get_table_names())
+            missing = []
+            for table in Base.metadata.sorted_tables:
+                if table.name not in tables:
+                    continue
+                existing = {c["name"] for c in inspector.get_columns(table.name)}
+                missing += [c for c in table.columns if c.name not in existing and c.nullable]
+            return missing
+        
+        try:
+            async with self.engine.begin() as conn:
+                for missing in await conn.run_sync(missing_columns):
+                    column_type = missing.type.compile(dialect=conn.dialect)
+                    await conn.execute(text(f"ALTER TABLE {missing.table.name} ADD COLUMN {missing.name} {column_type}"))
+                    logger.info(f"Added column {missing.table.name}.{missing.name}")
+                    backfill = COLUMN_BACKFILLS.get((missing.table.name, missing.name))
+                    if backfill is not None:
+                        await conn.execute(backfill())
+            return True
+        except Exception as e:
+            logger.error(f"Error adding missing columns: {e}")
+            return False
+    
+    async def _create_missing_indexes(self) -> bool:
+        """Create indexes declared on the models that an existing database lacks
+        
+        create_all only creates indexes together with new tables, so indexes
+        added to a model later are applied here (CREATE INDEX IF NOT EXISTS
+        semantics). A failure is logged and left for the next startup (returns False).
+        """
+        created = True
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    async with self.engine.begin() as conn:
+                        await conn.run_sync(index.create, checkfirst=True)
+                except Exception as e:
+                    logger.error(f"Error creating index {index.name}: {e}")
+                    created = False
+        return created
+    
+    def _insert_ignoring_conflicts(self, model):
+        """INSERT for model that skips rows violating a unique constraint"""
+        if self.engine.dialect.name == "postgresql":
+            return postgresql.insert(model).on_conflict_do_nothing()
+        if self.engine.dialect.name == "sqlite":
+            return sqlite.insert(model).on_conflict_do_nothing()
+        return insert(model)
+    
+    def _greatest(self, *values):
+        """GREATEST(...) in this dialect (SQLite's multi-argument max())"""
+        return func.greatest(*values) if self.engine.dialect.name == "postgresql" else func.max(*values)
+    
+    def _least(self, *values):
+        return func.least(*values) if self.engine.dialect.name == "postgresql" else func.min(*values)
+    
+    def _upsert_candles(self):
+        """INSERT for price_candles that, on a (resolution, bucket) conflict, merges the
+        new candle into the stored one in the same statement
+        
+        The row lock taken by ON CONFLICT DO UPDATE serializes concurrent writers
+        (the 15s market snapshot, the price history backfill, other workers), so
+        no high/low/close update is lost and no writer fails on the primary key.
+        Replaying a sample leaves the candle unchanged.
+        """
+        dialect = postgresql if self.engine.dialect.name == "postgresql" else sqlite
+        table = PriceCandle.__table__
+        stmt = dialect.insert(table)
+        new = stmt.excluded
+        return stmt.on_conflict_do_update(
+            index_elements=["resolution", "bucket"],
+            set_={
+                "high": self._greatest(table.c.high, new.high),
+                "low": self._least(table.c.low, new.low),
+                "open": case((new.first_ts < table.c.first_ts, new.open), else_=table.c.open),
+                "first_ts": self._least(table.c.first_ts, new.first_ts),
+                "close": case((new.last_ts >= table.c.last_ts, new.close), else_=table.c.close),
+                "last_ts": self._greatest(table.c.last_ts, new.last_ts),
+            },
+        )
+    
+    def _upsert_adding(self, model, key: List[str], columns: Iterable[str]):
+        """INSERT for model that, on a key conflict, adds columns onto the existing row"""
+        dialect = postgresql if self.engine.dialect.name == "postgresql" else sqlite
+        # Core table insert: skips the ORM bulk-insert bookkeeping on large executemany batches
+        stmt = dialect.insert(model.__table__)
+        updates = {column: model.__table__.c[column] + stmt.excluded[column] for column in columns}
+        updates["updated_at"] = stmt.excluded.updated_at
+        return stmt.on_conflict_do_update(index_elements=key, set_=updates)
+    
+    async def _add_to_summaries(self, session: AsyncSession, deltas: List[Dict[str, Any]]):
+        """Apply summary_deltas() rows within session's transaction"""
+        if deltas:
+            await session.execute(
+                self._upsert_adding(PortfolioSummary, ["user_address", "subnet_id"], SUMMARY_COLUMNS), deltas
+            )
+    
+    async def _backfill_portfolio_summaries(self) -> bool:
+        """Build portfolio summaries from existing positions and transactions if there are none yet
+        
+        Runs in the startup migration, under its lock; returns False on failure.
+        """
+        session = self.get_session()
+        async with session:
+            try:
+                if await session.scalar(select(PortfolioSummary.user_address).limit(1)) is not None:
+                    return True
+                
+                active = StakingPosition.status == "active"
+                harvested = and_(Transaction.transaction_type == "harvest", Transaction.status != "failed")
+                positions = await session.execute(select(
+                    StakingPosition.user_address,
+                    StakingPosition.subnet_id,
+                    func.sum(case((active, StakingPosition.amount), else_=0.0)),
+                    func.sum(case((active, StakingPosition.amount * StakingPosition.apy), else_=0.0)),
+                    func.sum(func.coalesce(StakingPosition.earnings, 0.0)),
+                    func.sum(case((active, 1), else_=0)),
+                ).group_by(StakingPosition.user_address, StakingPosition.subnet_id))
+                transactions = await session.execute(select(
+                    Transaction.user_address,
+                    Transaction.subnet_id,
+                    func.count(),
+                    func.sum(case((harvested, Transaction.amount), else_=0.0)),
+                ).group_by(Transaction.user_address, Transaction.subnet_id))
+                
+                contributions = [
+                    (address, subnet_id, {"staked": staked, "apy_weight": apy_weight, "earnings": earnings, "positions": count})
+                    for address, subnet_id, staked, apy_weight, earnings, count in positions
+                ] + [
+                    (address, subnet_id, {"transactions": count, "harvested": harvested_amount})
+                    for address, subnet_id, count, harvested_amount in transactions
+                ]
+                deltas = summary_deltas(contributions)
+                await self._add_to_summaries(session, deltas)
+                await session.commit()
+                if deltas:
+                    logger.info(f"Backfilled {len(deltas)} portfolio summary rows")
+                return True
+            except Exception as e:
+                logger.error(f"Error backfilling portfolio summaries: {e}")
+                await session.rollback()
+                return False
+    
+    def _in_addresses(self, column, addresses: List[str]):
+        """column = ANY(:addresses) on PostgreSQL (one statement, and plan, for any
+        number of addresses); an expanding IN elsewhere"""
+        if self.engine.dialect.name == "postgresql":
+            return column == any_(bindparam("addresses", addresses, type_=postgresql.ARRAY(String)))
+        return column.in_(addresses)
+    
+    def _epoch_seconds(self, column):
+        """SQL expression for a DateTime column as whole Unix seconds"""
+        if self.engine.dialect.name == "sqlite":
+            return cast(func.strftime("%s", column), BigInteger)
+        return cast(func.floor(func.extract("epoch", column)), BigInteger)
+    
+    def get_session(self) -> Optional[AsyncSession]:
+        """Get database session (use as "async with")"""
         if not self.SessionLocal:
             return None
         return self.SessionLocal()
     
-    def get_user(self, address: str) -> User:
+    async def get_user(self, address: str) -> User:
         """Get or create user"""
         session = self.get_session()
         if not session:
             return None
         
-        try:
-            user = session.query(User).filter_by(address=address).first()
-            if not user:
-                user = User(address=address)
-                session.add(user)
-                session.commit()
-            return user
-        except Exception as e:
-            logger.error(f"Error getting user {address}: {e}")
-            session.rollback()
-            return None
-        finally:
-            session.close()
+        async with session:
+            try:
+                user = await session.scalar(select(User).filter_by(address=address))
+                if not user:
+                    user = User(address=address)
+                    session.add(user)
+                    await session.commit()
+                return user
+            except Exception as e:
+                logger.error(f"Error getting user {address}: {e}")
+                await session.rollback()
+                return None
     
-    def get_user_staking_positions(self, address: str) -> list:
-        """Get all staking positions for a user"""
+    async def get_user_staking_positions(self, address: str, status: Optional[str] = None) -> list:
+        """Get all staking positions for a user (optionally only those with status)"""
         session = self.get_session()
         if not session:
             return []
         
-        try:
-            positions = session.query(StakingPosition).filter_by(
-                user_address=address
-            ).all()
-            return [
-                {
-                    "id": p.id,
-                    "subnet_id": p.subnet_id,
-                    "amount": p.amount,
-                    "apy": p.apy,
-                    "earnings": p.earnings,
-                    "status": p.status,
-                    "created_at": p.created_at.isoformat(),
-                }
-                for p in positions
-            ]
-        except Exception as e:
-            logger.error(f"Error fetching positions for {address}: {e}")
-            return []
-        finally:
-            session.close()
+        async with session:
+            try:
+                query = select(StakingPosition).filter_by(user_address=address)
+                if status is not None:
+                    query = query.filter_by(status=status)
+                positions = await session.scalars(query)
+                return [position_dict(p) for p in positions]
+            except Exception as e:
+                logger.error(f"Error fetching positions for {address}: {e}")
+                return []
+    
+    async def get_staking_positions_batch(self, addresses: List[str], status: Optional[str] = None) -> Dict[str, list]:
+        """Staking positions for several users in one query, grouped by address"""
+        grouped = {address: [] for address in addresses}
+        session = self.get_session()
+        if not session or not addresses:
+            return grouped
+        
+        async with session:
+            try:
+                query = select(StakingPosition).where(self._in_addresses(StakingPosition.user_address, addresses))
+                if status is not None:
+                    query = query.filter_by(status=status)
+                for p in await session.scalars(query.order_by(StakingPosition.user_address, StakingPosition.id)):
+                    grouped[p.user_address].append(position_dict(p))
+                return grouped
+            except Exception as e:
+                logger.error(f"Error fetching positions for {len(addresses)} addresses: {e}")
+                return grouped
     
-    def add_staking_position(self, address: str, subnet_id: int, amount: float, apy: float):
+    async def add_staking_position(self, address: str, subnet_id: int, amount: float, apy: float):
         """Add a new staking position"""
+        return await self.add_positions_bulk([{
+            "user_address": address,
+            "subnet_id": subnet_id,
+            "amount": amount,
+            "apy": apy,
+        }]) == 1
+    
+    async def _ensure_users(self, session: AsyncSession, addresses: Iterable[str]):
+        """Create any missing users rows in one INSERT ... ON CONFLICT DO NOTHING (within session's transaction)"""
+        now = datetime.utcnow()
+        rows = [{"address": address, "created_at": now, "updated_at": now} for address in sorted(set(addresses))]
+        if rows:
+            await session.execute(self._insert_ignoring_conflicts(User), rows)
+    
+    async def _insert_bulk(self, model, rows: List[Dict[str, Any]], contribution) -> int:
+        """Upsert the rows' users, executemany-insert the rows and add them to the
+        portfolio summaries (contribution maps a row to its summary delta), in one transaction"""
         session = self.get_session()
-        if not session:
-            return False
+        if not session or not rows:
+            return 0
         
-        try:
-            self.get_user(address)  # Ensure user exists
-            
-            position = StakingPosition(
-                user_address=address,
-                subnet_id=subnet_id,
-                amount=amount,
-                apy=apy,
-            )
-            session.add(position)
-            session.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Error adding staking position: {e}")
-            session.rollback()
-            return False
-        finally:
-            session.close()
+        async with session:
+            try:
+                await self._ensure_users(session, (row["user_address"] for row in rows))
+                await session.execute(insert(model), rows)
+                await self._add_to_summaries(session, summary_deltas(map(contribution, rows)))
+                await session.commit()
+                return len(rows)
+            except Exception as e:
+                logger.error(f"Error bulk inserting {model.__tablename__}: {e}")
+                await session.rollback()
+                return 0
     
-    def get_user_transaction_history(self, address: str, limit: int = 50) -> list:
-        """Get transaction history for a user"""
+    async def add_positions_bulk(self, positions: List[Dict[str, Any]]) -> int:
+        """Insert staking positions (user_address, subnet_id, amount, apy, optional
+        status/created_at) and their users in one transaction
+        
+        Returns the number of rows inserted (0 if the batch failed and was rolled back).
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_address": p["user_address"],
+                "subnet_id": p["subnet_id"],
+                "amount": p["amount"],
+                "apy": p["apy"],
+                "earnings": p.get("earnings") or 0.0,
+                "status": p.get("status") or "active",
+                "created_at": p.get("created_at") or now,
+                "updated_at": now,
+                "accrued_at": p.get("created_at") or now,
+            }
+            for p in positions
+        ]
+        return await self._insert_bulk(StakingPosition, rows, position_contribution)
+    
+    async def get_user_transaction_history(
+        self,
+        address: str,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> list:
+        """Get transaction history for a user, newest first
+        
+        after is the (timestamp, id) of the last row of the previous page; the
+        next page is read straight from the (user_address, timestamp DESC, id)
+        index, without OFFSET, however deep it is.
+        """
         session = self.get_session()
         if not session:
             return []
         
-        try:
-            transactions = session.query(Transaction).filter_by(
-                user_address=address
-            ).order_by(Transaction.timestamp.desc()).limit(limit).all()
-            
-            return [
-                {
-                    "id": t.id,
-                    "type": t.transaction_type,
-                    "subnet_id": t.subnet_id,
-                    "amount": t.amount,
-                    "status": t.status,
-                    "timestamp": t.timestamp.isoformat(),
-                    "hash": t.hash,
-                }
-                for t in transactions
-            ]
-        except Exception as e:
-            logger.error(f"Error fetching transactions for {address}: {e}")
-            return []
-        finally:
-            session.close()
+        async with session:
+            try:
+                query = select(Transaction).filter_by(user_address=address)
+                if after is not None:
+                    timestamp, transaction_id = after
+                    query = query.where(or_(
+                        Transaction.timestamp < timestamp,
+                        and_(Transaction.timestamp == timestamp, Transaction.id > transaction_id),
+                    ))
+                transactions = await session.scalars(
+                    query.order_by(Transaction.timestamp.desc(), Transaction.id).limit(limit)
+                )
+                
+                return [transaction_dict(t) for t in transactions]
+            except Exception as e:
+                logger.error(f"Error fetching transactions for {address}: {e}")
+                return []
+    
+    async def get_transaction_history_batch(self, addresses: List[str], limit: int = 50) -> Dict[str, list]:
+        """Newest limit transactions for each of several users in one query, grouped by address
+        
+        A row_number() window partitioned by address (ordered like the
+        (user_address, timestamp DESC, id) index) applies the limit per address.
+        """
+        grouped = {address: [] for address in addresses}
+        session = self.get_session()
+        if not session or not addresses:
+            return grouped
+        
+        async with session:
+            try:
+                rank = func.row_number().over(
+                    partition_by=Transaction.user_address,
+                    order_by=(Transaction.timestamp.desc(), Transaction.id),
+                ).label("rank")
+                ranked = (
+                    select(Transaction, rank)
+                    .where(self._in_addresses(Transaction.user_address, addresses))
+                    .subquery()
+                )
+                ranked_transaction = aliased(Transaction, ranked)
+                transactions = await session.scalars(
+                    select(ranked_transaction)
+                    .where(ranked.c.rank <= limit)
+                    .order_by(ranked.c.user_address, ranked.c.rank)
+                )
+                for t in transactions:
+                    grouped[t.user_address].append(transaction_dict(t))
+                return grouped
+            except Exception as e:
+                logger.error(f"Error fetching transactions for {len(addresses)} addresses: {e}")
+                return grouped
     
-    def add_transaction(self, address: str, tx_type: str, subnet_id: int, amount: float, tx_hash: str = None) -> bool:
+    async def add_transaction(self, address: str, tx_type: str, subnet_id: int, amount: float, tx_hash: str = None) -> bool:
         """Add a transaction"""
+        return await self.add_transactions_bulk([{
+            "user_address": address,
+            "transaction_type": tx_type,
+            "subnet_id": subnet_id,
+            "amount": amount,
+            "hash": tx_hash,
+        }]) == 1
+    
+    async def add_transactions_bulk(self, transactions: List[Dict[str, Any]]) -> int:
+        """Insert transactions (user_address, transaction_type, subnet_id, amount,
+        optional hash/status/timestamp) and their users in one transaction
+        
+        Returns the number of rows inserted (0 if the batch failed and was rolled back).
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_address": t["user_address"],
+                "transaction_type": t["transaction_type"],
+                "subnet_id": t["subnet_id"],
+                "amount": t["amount"],
+                "hash": t.get("hash"),
+                "status": t.get("status") or "pending",
+                "timestamp": t.get("timestamp") or now,
+            }
+            for t in transactions
+        ]
+        return await self._insert_bulk(Transaction, rows, transaction_contribution)
+    
+    async def get_portfolio(self, address: str) -> Optional[Dict[str, Any]]:
+        """Totals and per-subnet breakdown for a user from the portfolio summaries (None on error)
+        
+        One primary-key range read of at most one row per subnet, however many
+        positions and transactions the user has.
+        """
+        summary = {
+            "total_staked": 0.0,
+            "total_earnings": 0.0,
+            "weighted_apy": None,
+            "harvested": 0.0,
+            "positions": 0,
+            "transactions": 0,
+            "subnets": [],
+        }
         session = self.get_session()
         if not session:
-            return False
+            return summary
         
-        try:
-            self.get_user(address)  # Ensure user exists
+        async with session:
+            try:
+                rows = await session.scalars(
+                    select(PortfolioSummary).filter_by(user_address=address).order_by(PortfolioSummary.subnet_id)
+                )
+                apy_weight = 0.0
+                for row in rows:
+                    summary["total_staked"] += row.staked
+                    summary["total_earnings"] += row.earnings
+                    summary["harvested"] += row.harvested
+                    summary["positions"] += row.positions
+                    summary["transactions"] += row.transactions
+                    apy_weight += row.apy_weight
+                    summary["subnets"].append({
+                        "subnet_id": row.subnet_id,
+                        "staked": row.staked,
+                        "earnings": row.earnings,
+                        "weighted_apy": row.apy_weight / row.staked if row.staked > 0 else None,
+                        "harvested": row.harvested,
+                        "positions": row.positions,
+                        "transactions": row.transactions,
+                    })
+                if summary["total_staked"] > 0:
+                    summary["weighted_apy"] = apy_weight / summary["total_staked"]
+                return summary
+            except Exception as e:
+                logger.error(f"Error fetching portfolio for {address}: {e}")
+                return None
+    
+    # ============================================
+    # EARNINGS ACCRUAL METHODS
+    # ============================================
+    
+    async def accrue_earnings(self, apys: np.ndarray, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+        """Compound earnings of every active position up to now and refresh its APY
+        
+        apys is the current APY indexed by subnet id (NaN keeps a position's
+        stored APY). Positions are read in id order, chunk_size at a time, and
+        each chunk is computed over whole NumPy columns and written back with
+        batched UPDATE ... FROM VALUES plus its portfolio summary deltas, in one
+        transaction per chunk. accrued_at records the accrual time (created_at
+        before the first run), so a rerun after a failure never accrues a period
+        twice, and other updates to a position never skip one.
+        """
+        stats = {"rows": 0, "chunks": 0, "seconds": 0.0, "rows_per_second": 0.0}
+        if not self.SessionLocal:
+            return stats
+        
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        last_id = 0
+        while True:
+            async with self.SessionLocal() as session:
+                try:
+                    rows = (await session.execute(
+                        select(
+                            StakingPosition.id,
+                            StakingPosition.user_address,
+                            StakingPosition.subnet_id,
+                            StakingPosition.amount,
+                            StakingPosition.apy,
+                            StakingPosition.earnings,
+                            func.coalesce(StakingPosition.accrued_at, StakingPosition.created_at),
+                        )
+                        .where(StakingPosition.status == "active", StakingPosition.id > last_id)
+                        .order_by(StakingPosition.id)
+                        .limit(chunk_size)
+                    )).all()
+                    if not rows:
+                        break
+                    
+                    ids, addresses, subnets, amount, apy, earnings, accrued_at = zip(*rows)
+                    ids = np.array(ids, dtype=np.int64)
+                    subnets = np.array(subnets, dtype=np.int64)
+                    amount = np.array(amount, dtype=np.float64)
+                    apy = np.array(apy, dtype=np.float64)
+                    earnings = np.nan_to_num(np.array(earnings, dtype=np.float64))
+                    elapsed = (np.datetime64(now, "us") - np.array(accrued_at, dtype="datetime64[us]")) / np.timedelta64(1, "s")
+                    
+                    in_range = (subnets >= 0) & (subnets < len(apys))
+                    latest = np.full(len(ids), np.nan)
+                    latest[in_range] = apys[subnets[in_range]]
+                    new_apy = np.where(np.isnan(latest), apy, latest)
+                    new_earnings = accrue(amount, earnings, new_apy, np.nan_to_num(elapsed))
+                    
+                    await self._write_accrual(session, ids, new_apy, new_earnings, now)
+                    await self._add_to_summaries(session, self._accrual_deltas(
+                        np.array(addresses), subnets,
+                        earnings=new_earnings - earnings,
+                        apy_weight=amount * (new_apy - apy),
+                    ))
+                    await session.commit()
+                except Exception as e:
+                    logger.error(f"Error accruing earnings after position {last_id}: {e}")
+                    await session.rollback()
+                    break
             
-            transaction = Transaction(
-                user_address=address,
-                transaction_type=tx_type,
-                subnet_id=subnet_id,
-                amount=amount,
-                hash=tx_hash,
-            )
-            session.add(transaction)
-            session.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Error adding transaction: {e}")
-            session.rollback()
-            return False
-        finally:
-            session.close()
+            stats["rows"] += len(ids)
+            stats["chunks"] += 1
+            last_id = int(ids[-1])
+            if len(ids) < chunk_size:
+                break
+        
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        stats["rows_per_second"] = round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        logger.info(
+            f"Accrued earnings for {stats['rows']} positions in {stats['seconds']}s "
+            f"({stats['rows_per_second']} rows/s)"
+        )
+        return stats
+    
+    async def _write_accrual(self, session: AsyncSession, ids: np.ndarray, apy: np.ndarray, earnings: np.ndarray, now: datetime):
+        """Write new APY and earnings for a chunk, UPDATE_BATCH rows per statement"""
+        for start in range(0, len(ids), UPDATE_BATCH):
+            batch = slice(start, start + UPDATE_BATCH)
+            rows = list(zip(ids[batch].tolist(), apy[batch].tolist(), earnings[batch].tolist()))
+            if self.engine.dialect.name == "postgresql":
+                accrued = values(
+                    column("id", Integer), column("apy", Float), column("earnings", Float), name="accrued"
+                ).data(rows)
+                await session.execute(
+                    update(StakingPosition)
+                    .where(StakingPosition.id == accrued.c.id)
+                    .values(apy=accrued.c.apy, earnings=accrued.c.earnings, accrued_at=now)
+                )
+            else:
+                # No column aliases on a VALUES list elsewhere: executemany by primary key
+                await session.execute(
+                    update(StakingPosition.__table__)
+                    .where(StakingPosition.id == bindparam("row_id"))
+                    .values(apy=bindparam("row_apy"), earnings=bindparam("row_earnings"), accrued_at=now),
+                    [{"row_id": i, "row_apy": a, "row_earnings": e} for i, a, e in rows],
+                )
+    
+    @staticmethod
+    def _accrual_deltas(addresses: np.ndarray, subnets: np.ndarray, **columns: np.ndarray) -> List[Dict[str, Any]]:
+        """Sum per-position column deltas into summary_deltas() rows per (address, subnet)"""
+        address_index, address_codes = np.unique(addresses, return_inverse=True)
+        keys, groups = np.unique(
+            address_codes.astype(np.int64) * (int(subnets.max()) + 1) + subnets, return_inverse=True
+        )
+        sums = {name: np.bincount(groups, weights=delta, minlength=len(keys)) for name, delta in columns.items()}
+        first = np.zeros(len(keys), dtype=np.int64)
+        first[groups] = np.arange(len(groups))
+        return summary_deltas(
+            (str(addresses[i]), int(subnets[i]), {name: float(total[g]) for name, total in sums.items()})
+            for g, i in enumerate(first)
+        )
+    
+    # ============================================
+    # PRICE HISTORY METHODS
+    # ============================================
+    
+    async def get_price_backfill_mark(self) -> Optional[datetime]:
+        """Time of the newest backfilled CoinGecko sample, or None if nothing was backfilled yet"""
+        session = self.get_session()
+        if not session:
+            return None
+        
+        async with session:
+            try:
+                return await session.scalar(
+                    select(IngestionMark.value).where(IngestionMark.name == PRICE_BACKFILL_MARK)
+                )
+            except Exception as e:
+                logger.error(f"Error fetching price backfill mark: {e}")
+                return None
+    
+    async def add_price_points(
+        self,
+        points: Iterable[Tuple[datetime, float]],
+        backfilled_until: Optional[datetime] = None,
+    ) -> int:
+        """Fold (timestamp, price) samples into every rollup in one transaction
+        
+        Samples are folded into one candle per bucket in Python, then merged
+        into the stored candles with one upsert per resolution. With
+        backfilled_until, the price backfill mark is moved there (never back)
+        in the same transaction, so it never gets ahead of the stored samples.
+        Returns the number of samples stored.
+        """
+        points = sorted(points)
+        session = self.get_session()
+        if not session or not points:
+            return 0
+        
+        async with session:
+            try:
+                for resolution, (width, _) in PRICE_RESOLUTIONS.items():
+                    rows = [{"resolution": resolution, **candle} for candle in fold_candles(points, width)]
+                    await session.execute(self._upsert_candles(), rows)
+                if backfilled_until is not None:
+                    dialect = postgresql if self.engine.dialect.name == "postgresql" else sqlite
+                    stmt = dialect.insert(IngestionMark.__table__).values(
+                        name=PRICE_BACKFILL_MARK, value=backfilled_until
+                    )
+                    await session.execute(stmt.on_conflict_do_update(
+                        index_elements=["name"],
+                        set_={"value": self._greatest(IngestionMark.__table__.c.value, stmt.excluded.value)},
+                    ))
+                await session.commit()
+                return len(points)
+            except Exception as e:
+                logger.error(f"Error adding price points: {e}")
+                await session.rollback()
+                return 0
+    
+    async def get_price_candles(self, resolution: str, start: datetime, end: datetime) -> list:
+        """Candles of one resolution with bucket start in [start, end], oldest first"""
+        session = self.get_session()
+        if not session:
+            return []
+        
+        async with session:
+            try:
+                candles = await session.scalars(select(PriceCandle).where(
+                    PriceCandle.resolution == resolution,
+                    PriceCandle.bucket >= start,
+                    PriceCandle.bucket <= end,
+                ).order_by(PriceCandle.bucket))
+                
+                return [
+                    {
+                        "timestamp": c.bucket.isoformat(),
+                        "open": c.open,
+                        "high": c.high,
+                        "low": c.low,
+                        "close": c.close,
+                    }
+                    for c in candles
+                ]
+            except Exception as e:
+                logger.error(f"Error fetching {resolution} price candles: {e}")
+                return []
+    
+    async def prune_price_candles(self) -> int:
+        """Delete candles older than their resolution's retention"""
+        session = self.get_session()
+        if not session:
+            return 0
+        
+        async with session:
+            try:
+                deleted = 0
+                now = datetime.utcnow()
+                for resolution, (_, retention) in PRICE_RESOLUTIONS.items():
+                    if retention is None:
+                        continue
+                    result = await session.execute(delete(PriceCandle).where(
+                        PriceCandle.resolution == resolution,
+                        PriceCandle.bucket < now - retention,
+                    ))
+                    deleted += result.rowcount
+                await session.commit()
+                return deleted
+            except Exception as e:
+                logger.error(f"Error pruning price candles: {e}")
+                await session.rollback()
+                return 0
+    
+    # ============================================
+    # SUBNET SNAPSHOT METHODS
+    # ============================================
+    
+    async def add_subnet_snapshots(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert snapshot rows (subnet_id, emissions, total_validators, total_neurons,
+        timestamp) in one executemany; rows already stored for that subnet and
+        timestamp are skipped. Returns the number of rows submitted"""
+        session = self.get_session()
+        if not session or not rows:
+            return 0
+        
+        async with session:
+            try:
+                await session.execute(self._insert_ignoring_conflicts(SubnetSnapshot), rows)
+                await session.commit()
+                return len(rows)
+            except Exception as e:
+                logger.error(f"Error adding subnet snapshots: {e}")
+                await session.rollback()
+                return 0
+    
+    async def get_subnet_history(
+        self,
+        subnet_ids: List[int],
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+    ) -> Dict[int, list]:
+        """Average emissions, validators and neurons per subnet per time bucket
+        
+        One grouped query over the (subnet_id, timestamp) index for all subnets.
+        """
+        session = self.get_session()
+        if not session:
+            return {}
+        
+        async with session:
+            try:
+                bucket = (self._epoch_seconds(SubnetSnapshot.timestamp) // bucket_seconds).label("bucket")
+                rows = await session.execute(select(
+                    SubnetSnapshot.subnet_id,
+                    bucket,
+                    func.avg(SubnetSnapshot.emissions),
+                    func.avg(SubnetSnapshot.total_validators),
+                    func.avg(SubnetSnapshot.total_neurons),
+                ).where(
+                    SubnetSnapshot.subnet_id.in_(subnet_ids),
+                    SubnetSnapshot.timestamp >= start,
+                    SubnetSnapshot.timestamp <= end,
+                ).group_by(SubnetSnapshot.subnet_id, bucket).order_by(SubnetSnapshot.subnet_id, bucket))
+                
+                history = {subnet_id: [] for subnet_id in subnet_ids}
+                epoch = datetime(1970, 1, 1)
+                for subnet_id, bucket_index, emissions, validators, neurons in rows:
+                    history[subnet_id].append({
+                        "timestamp": (epoch + timedelta(seconds=int(bucket_index) * bucket_seconds)).isoformat(),
+                        "emissions": emissions,
+                        "validators": validators,
+                        "neurons": neurons,
+                    })
+                return history
+            except Exception as e:
+                logger.error(f"Error fetching subnet history: {e}")
+                return {}
+    
+    async def prune_subnet_snapshots(self, retention: timedelta) -> int:
+        """Delete snapshots older than retention"""
+        session = self.get_session()
+        if not session:
+            return 0
+        
+        async with session:
+            try:
+                result = await session.execute(delete(SubnetSnapshot).where(
+                    SubnetSnapshot.timestamp < datetime.utcnow() - retention
+                ))
+                await session.commit()
+                return result.rowcount
+            except Exception as e:
+                logger.error(f"Error pruning subnet snapshots: {e}")
+                await session.rollback()
+                return 0
     
     # ============================================
     # AUTHENTICATION USER METHODS
@@ -249,28 +1140,27 @@ class Database:
         if not session:
             return None
         
-        try:
-            user = AuthUser(
-                email=email,
-                username=username,
-                password_hash=password_hash
-            )
-            session.add(user)
-            session.commit()
-            session.refresh(user)
-            
-            return {
-                "id": user.id,
-                "email": user.email,
-                "username": user.username,
-                "created_at": user.created_at.isoformat()
-            }
-        except Exception as e:
-            logger.error(f"Error creating user: {e}")
-            session.rollback()
-            return None
-        finally:
-            session.close()
+        async with session:
+            try:
+                user = AuthUser(
+                    email=email,
+                    username=username,
+                    password_hash=password_hash
+                )
+                session.add(user)
+                await session.commit()
+                await session.refresh(user)
+                
+                return {
+                    "id": user.id,
+                    "email": user.email,
+                    "username": user.username,
+                    "created_at": user.created_at.isoformat()
+                }
+            except Exception as e:
+                logger.error(f"Error creating user: {e}")
+                await session.rollback()
+                return None
     
     async def get_user_by_email(self, email: str):
         """Get user by email"""
@@ -278,24 +1168,23 @@ class Database:
         if not session:
             return None
         
-        try:
-            user = session.query(AuthUser).filter_by(email=email).first()
-            if not user:
+        async with session:
+            try:
+                user = await session.scalar(select(AuthUser).filter_by(email=email))
+                if not user:
+                    return None
+                
+                return {
+                    "id": user.id,
+                    "email": user.email,
+                    "username": user.username,
+                    "password_hash": user.password_hash,
+                    "created_at": user.created_at.isoformat(),
+                    "last_login": user.last_login.isoformat() if user.last_login else None
+                }
+            except Exception as e:
+                logger.error(f"Error getting user by email: {e}")
                 return None
-            
-            return {
-                "id": user.id,
-                "email": user.email,
-                "username": user.username,
-                "password_hash": user.password_hash,
-                "created_at": user.created_at.isoformat(),
-                "last_login": user.last_login.isoformat() if user.last_login else None
-            }
-        except Exception as e:
-            logger.error(f"Error getting user by email: {e}")
-            return None
-        finally:
-            session.close()
     
     async def get_user_by_id(self, user_id: int):
         """Get user by ID"""
@@ -303,23 +1192,22 @@ class Database:
         if not session:
             return None
         
-        try:
-            user = session.query(AuthUser).filter_by(id=user_id).first()
-            if not user:
+        async with session:
+            try:
+                user = await session.scalar(select(AuthUser).filter_by(id=user_id))
+                if not user:
+                    return None
+                
+                return {
+                    "id": user.id,
+                    "email": user.email,
+                    "username": user.username,
+                    "created_at": user.created_at.isoformat(),
+                    "last_login": user.last_login.isoformat() if user.last_login else None
+                }
+            except Exception as e:
+                logger.error(f"Error getting user by ID: {e}")
                 return None
-            
-            return {
-                "id": user.id,
-                "email": user.email,
-                "username": user.username,
-                "created_at": user.created_at.isoformat(),
-                "last_login": user.last_login.isoformat() if user.last_login else None
-            }
-        except Exception as e:
-            logger.error(f"Error getting user by ID: {e}")
-            return None
-        finally:
-            session.close()
     
     async def update_last_login(self, user_id: int):
         """Update user's last login timestamp"""
@@ -327,22 +1215,21 @@ class Database:
         if not session:
             return False
         
-        try:
-            user = session.query(AuthUser).filter_by(id=user_id).first()
-            if user:
-                user.last_login = datetime.utcnow()
-                session.commit()
-                return True
-            return False
-        except Exception as e:
-            logger.error(f"Error updating last login: {e}")
-            session.rollback()
-            return False
-        finally:
-            session.close()
+        async with session:
+            try:
+                user = await session.scalar(select(AuthUser).filter_by(id=user_id))
+                if user:
+                    user.last_login = datetime.utcnow()
+                    await session.commit()
+                    return True
+                return False
+            except Exception as e:
+                logger.error(f"Error updating last login: {e}")
+                await session.rollback()
+                return False
     
-    def close(self):
-        """Close database connection"""
+    async def close(self):
+        """Close database connection pool"""
         if self.engine:
-            self.engine.dispose()
+            await self.engine.dispose()
             logger.info("Database connection closed")
@@ -0,0 +1,231 @@
+"""
+Upstream Resilience
+Token-bucket rate limiting, circuit breaking and jittered retries for upstream APIs
+"""
+
+import asyncio
+import random
+import time
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Atomically refill and take one token. Returns the seconds to wait (as a
+# string, since Lua numbers are truncated to integers on return) or "0".
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class UpstreamError(Exception):
+    """An upstream request failed (after retries) or was not attempted"""
+
+
+class CircuitOpenError(UpstreamError):
+    """Upstream call rejected because its circuit breaker is open"""
+
+
+class RateLimitedError(UpstreamError):
+    """Upstream call rejected because the rate limiter could not grant a token in time"""
+
+
+class TokenBucket:
+    """Token-bucket rate limiter, shared across workers through Redis when available"""
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int, redis_client=None):
+        """Initialize limiter (rate in requests per minute, burst = bucket capacity)"""
+        self.key = f"ratelimit:{name}"
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.redis_client = redis_client
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client else None
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    async def acquire(self, max_wait: float) -> None:
+        """Take one token, waiting up to max_wait seconds for one to become available"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = await self._try_take()
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitedError(f"{self.key} exhausted, next token in {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    async def _try_take(self) -> float:
+        if self._script is not None:
+            try:
+                return float(await self._script(keys=[self.key], args=[self.rate, self.capacity]))
+            except Exception as e:
+                # Fall back to a per-worker bucket rather than blocking upstream calls
+                logger.warning(f"Shared rate limiter unavailable for {self.key}: {e}")
+
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class CircuitBreaker:
+    """Fail fast after consecutive failures, then let a single probe through (half-open)
+
+    State is kept per worker: each worker notices an outage after its own
+    failure_threshold failures, which is a handful of requests at most.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """Initialize breaker in the closed state"""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now (in half-open, only the one probe)"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """Give back a half-open probe slot for a call that never reached the upstream"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold or on a failed probe"""
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit {self.name} opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+def backoff_delay(attempt: int, base: float = 0.25, cap: float = 4.0) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after(response: httpx.Response, cap: float = 30.0) -> float:
+    """Seconds requested by a Retry-After header (delta form only), capped"""
+    try:
+        return min(cap, max(0.0, float(response.headers.get("retry-after", 0))))
+    except ValueError:
+        return 0.0
+
+
+class UpstreamGuard:
+    """Runs upstream requests through a rate limiter, circuit breaker and retries"""
+
+    def __init__(
+        self,
+        name: str,
+        limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        max_retries: int = 2,
+        rate_limit_wait: float = 2.0,
+    ):
+        """Initialize guard for one upstream"""
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.rate_limit_wait = rate_limit_wait
+
+    @classmethod
+    def from_config(cls, config, redis_client=None) -> "UpstreamGuard":
+        """Build guard from an UpstreamConfig (pass redis_client to share the limiter across workers)"""
+        return cls(
+            config.name,
+            TokenBucket(config.name, config.rate_limit_per_minute, config.rate_limit_burst, redis_client),
+            CircuitBreaker(config.name, config.failure_threshold, config.recovery_timeout),
+            max_retries=config.max_retries,
+            rate_limit_wait=config.rate_limit_wait,
+        )
+
+    async def get(self, client: httpx.AsyncClient, path: str, **kwargs) -> httpx.Response:
+        """GET path, retrying transport errors, 429 and 5xx with jittered backoff
+
+        Raises UpstreamError (or a subclass) when the upstream is unavailable,
+        and httpx.HTTPStatusError for other 4xx responses, which are answers
+        rather than outages and do not count against the circuit. The circuit
+        counts logical calls: one failure once the retries are used up, not
+        one per attempt.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit open")
+
+        last_error = None
+        delay = 0.0
+        try:
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    await asyncio.sleep(delay)
+
+                try:
+                    await self.limiter.acquire(self.rate_limit_wait)
+                    response = await client.get(path, **kwargs)
+                except httpx.TransportError as e:
+                    last_error = f"{type(e).__name__}: {e}"
+                    delay = backoff_delay(attempt)
+                    continue
+
+                if response.status_code == 429 or response.status_code >= 500:
+                    last_error = f"HTTP {response.status_code}"
+                    delay = max(backoff_delay(attempt), retry_after(response))
+                    continue
+
+                self.breaker.record_success()
+                response.raise_for_status()
+                return response
+        except BaseException:
+            # Rate limited, cancelled or an unexpected error: the upstream was
+            # not shown to be down, so just give back a half-open probe slot
+            self.breaker.release_probe()
+            raise
+
+        self.breaker.record_failure()
+        raise UpstreamError(f"{self.name} {path} failed after {self.max_retries + 1} attempts ({last_error})")
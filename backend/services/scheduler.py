@@ -0,0 +1,208 @@
+"""
+Ingestion Scheduler
+Keeps upstream data pre-warmed in the cache on per-source intervals
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.cache import RELEASE_LOCK_SCRIPT, RENEW_LOCK_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+# Redis key holding the leader's token, and hash of per-source stats written by the leader
+LEADER_KEY = "scheduler:leader"
+STATS_KEY = "scheduler:stats"
+
+
+class IngestionSource:
+    """One upstream dataset refreshed on an interval"""
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], Awaitable[Any]],
+        store: Callable[[Any], Awaitable[Any]],
+        interval: float,
+    ):
+        """Initialize source (interval in seconds, overridable with INGESTION_<NAME>_INTERVAL)"""
+        self.name = name
+        self.fetch = fetch
+        self.store = store
+        self.interval = float(os.getenv(f"INGESTION_{name.upper()}_INTERVAL", interval))
+
+
+class SourceStats:
+    """Freshness bookkeeping for one source"""
+
+    def __init__(self, interval: float):
+        """Initialize empty stats"""
+        self.interval = interval
+        self.last_attempt: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_duration_ms: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, shared with other workers through Redis"""
+        return dict(self.__dict__)
+
+
+def describe_stats(stats: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """Add age (seconds since last success) and lag (seconds overdue) to raw stats"""
+    described = dict(stats)
+    last_success = stats.get("last_success")
+    if last_success is None:
+        described["age_seconds"] = None
+        described["lag_seconds"] = None
+    else:
+        age = now - last_success
+        described["age_seconds"] = round(age, 3)
+        described["lag_seconds"] = round(max(0.0, age - stats["interval"]), 3)
+    return described
+
+
+class IngestionScheduler:
+    """Refreshes every source on its interval while this worker holds the leader lease
+
+    Only one worker polls the upstreams; the others keep trying to take over
+    the lease so polling resumes within leader_ttl if the leader dies.
+    Without Redis every worker acts as its own leader.
+    """
+
+    def __init__(self, cache_service, sources: List[IngestionSource]):
+        """Initialize scheduler (call start() to begin polling)"""
+        self.cache = cache_service
+        self.sources = {source.name: source for source in sources}
+        self.stats = {source.name: SourceStats(source.interval) for source in sources}
+        self.leader_ttl = float(os.getenv("INGESTION_LEADER_TTL", 15))
+        self.token = uuid.uuid4().hex
+        self.is_leader = False
+        self._became_leader = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def redis_client(self):
+        return self.cache.redis_client
+
+    def start(self):
+        """Start the leader election loop and one polling loop per source"""
+        self._tasks.append(asyncio.create_task(self._leader_loop()))
+        for source in self.sources.values():
+            self._tasks.append(asyncio.create_task(self._source_loop(source)))
+        logger.info(f"Ingestion scheduler started for {', '.join(self.sources)}")
+
+    async def stop(self):
+        """Stop polling and hand the leader lease back"""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=2.0)
+        self._tasks.clear()
+
+        if self.is_leader and self.redis_client:
+            try:
+                await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, LEADER_KEY, self.token)
+            except Exception as e:
+                logger.error(f"Error releasing ingestion leader lease: {e}")
+        self.is_leader = False
+
+    async def _leader_loop(self):
+        """Take or renew the leader lease every third of its TTL"""
+        while True:
+            leader = await self._hold_lease()
+            if leader != self.is_leader:
+                logger.info(f"Ingestion leadership {'acquired' if leader else 'lost'}")
+            self.is_leader = leader
+            if leader:
+                self._became_leader.set()
+            else:
+                self._became_leader.clear()
+            await asyncio.sleep(self.leader_ttl / 3)
+
+    async def _hold_lease(self) -> bool:
+        if not self.redis_client:
+            return True
+
+        ttl_ms = int(self.leader_ttl * 1000)
+        try:
+            if self.is_leader and await self.redis_client.eval(
+                RENEW_LOCK_SCRIPT, 1, LEADER_KEY, self.token, ttl_ms
+            ):
+                return True
+            return bool(await self.redis_client.set(LEADER_KEY, self.token, nx=True, px=ttl_ms))
+        except Exception as e:
+            # Stop polling rather than risk every worker polling at once
+            logger.error(f"Ingestion leader election error: {e}")
+            return False
+
+    async def _source_loop(self, source: IngestionSource):
+        """Refresh one source on its interval whenever we are the leader"""
+        while True:
+            await self._became_leader.wait()
+            started = time.monotonic()
+            await self.refresh(source.name)
+            # Small jitter keeps sources with equal intervals from firing together
+            delay = source.interval - (time.monotonic() - started)
+            await asyncio.sleep(max(0.0, delay) + random.uniform(0, min(1.0, source.interval / 10)))
+
+    async def refresh(self, name: str) -> bool:
+        """Fetch one source now and store it in the cache; returns success"""
+        source = self.sources[name]
+        stats = self.stats[name]
+        stats.last_attempt = time.time()
+        started = time.perf_counter()
+        try:
+            value = await source.fetch()
+            await source.store(value)
+            stats.last_success = time.time()
+            stats.last_error = None
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            return True
+        except Exception as e:
+            logger.error(f"Ingestion of {name} failed: {e}")
+            stats.last_error = str(e)
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            return False
+        finally:
+            stats.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            await self._publish_stats(name)
+
+    async def _publish_stats(self, name: str):
+        """Share stats so any worker can report them, not just the leader"""
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.hset(STATS_KEY, name, json.dumps(self.stats[name].to_dict()))
+        except Exception as e:
+            logger.error(f"Error publishing ingestion stats for {name}: {e}")
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Freshness and lag per source, as last recorded by the leader"""
+        stats = {name: source_stats.to_dict() for name, source_stats in self.stats.items()}
+        if self.redis_client and not self.is_leader:
+            try:
+                shared = await self.redis_client.hgetall(STATS_KEY)
+                for name, raw in shared.items():
+                    name = name.decode() if isinstance(name, bytes) else name
+                    if name in stats:
+                        stats[name] = json.loads(raw)
+            except Exception as e:
+                logger.error(f"Error reading ingestion stats: {e}")
+
+        now = time.time()
+        return {
+            "leader": self.is_leader,
+            "sources": {name: describe_stats(source_stats, now) for name, source_stats in stats.items()},
+        }
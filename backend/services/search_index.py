@@ -0,0 +1,137 @@
+"""
+Search Index
+Prefix search over validator and neuron hotkeys, coldkeys and names
+"""
+
+import re
+import logging
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A complete SS58 address (base58 alphabet); only these go to the upstream search
+SS58_PATTERN = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{46,48}$")
+
+SEARCH_FIELDS = ("hotkey", "coldkey", "name")
+
+
+def _first(row: Dict[str, Any], names: Sequence[str]) -> Any:
+    for name in names:
+        value = row.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def validator_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Searchable fields of one TAOStats validator"""
+    return {
+        "type": "validator",
+        "hotkey": _first(row, ("hotkey", "hotkey_ss58")),
+        "coldkey": _first(row, ("coldkey", "coldkey_ss58")),
+        "name": row.get("name"),
+        "subnet": _first(row, ("subnet_id", "netuid")),
+    }
+
+
+def neuron_record(subnet_id: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Searchable fields of one TAOStats neuron (kept small, since every subnet's neurons are cached)"""
+    return {
+        "type": "neuron",
+        "hotkey": _first(row, ("hotkey", "hotkey_ss58")),
+        "coldkey": _first(row, ("coldkey", "coldkey_ss58")),
+        "uid": row.get("uid"),
+        "subnet": subnet_id,
+    }
+
+
+def is_ss58(query: str) -> bool:
+    """Whether query looks like a full SS58 address rather than a prefix"""
+    return bool(SS58_PATTERN.match(query))
+
+
+class SearchIndex:
+    """Sorted array of lower-cased search terms, queried by binary search
+
+    Each record is indexed once per non-empty hotkey, coldkey and name, so a
+    prefix lookup is a bisect plus a scan over the matching run.
+    """
+
+    def __init__(
+        self,
+        validators: List[Dict[str, Any]],
+        neurons: Optional[List[Dict[str, Any]]],
+        version: Optional[Tuple] = None,
+        content: Optional[str] = None,
+    ):
+        """Build index from the validator list and neuron_record() entries (if ingested yet)
+
+        version identifies the cache entries the sources were read from and
+        content is a hash of the sources themselves.
+        """
+        self.version = version
+        self.content = content
+        records = [validator_record(row) for row in validators] + list(neurons or [])
+
+        entries = []
+        self.keys = set()
+        for record in records:
+            for field in SEARCH_FIELDS:
+                value = record.get(field)
+                if value:
+                    entries.append((str(value).lower(), field, record))
+            for field in ("hotkey", "coldkey"):
+                if record.get(field):
+                    self.keys.add(record[field])
+
+        entries.sort(key=lambda entry: entry[0])
+        self.terms = [entry[0] for entry in entries]
+        self.matches = [(entry[1], entry[2]) for entry in entries]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def knows(self, key: str) -> bool:
+        """Whether an exact hotkey or coldkey is indexed"""
+        return key in self.keys
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Records with a hotkey, coldkey or name starting with query (case-insensitive)"""
+        prefix = query.lower()
+        results = []
+        seen = set()
+        for i in range(bisect_left(self.terms, prefix), len(self.terms)):
+            if not self.terms[i].startswith(prefix):
+                break
+            field, record = self.matches[i]
+            if id(record) in seen:
+                continue
+            seen.add(id(record))
+            results.append({**record, "matched": field})
+            if len(results) >= limit:
+                break
+        return results
+
+
+def merge_neurons(
+    previous: Optional[List[Dict[str, Any]]],
+    fetched: Dict[int, Any],
+) -> List[Dict[str, Any]]:
+    """Combine per-subnet neuron fetches into neuron_record() entries
+
+    fetched maps subnet id to its neuron list, or to an exception if that
+    subnet could not be fetched, in which case its previous records are kept.
+    """
+    kept = {}
+    for record in previous or []:
+        kept.setdefault(record.get("subnet"), []).append(record)
+
+    records = []
+    for subnet_id, neurons in fetched.items():
+        if isinstance(neurons, BaseException):
+            logger.warning(f"Keeping previous neurons for subnet {subnet_id}: {neurons}")
+            records.extend(kept.get(subnet_id, []))
+        else:
+            records.extend(neuron_record(subnet_id, row) for row in neurons)
+    return records
@@ -0,0 +1,186 @@
+"""
+Staking Simulation
+Compounded yield projections and Monte Carlo bands for staking across subnets,
+from per-subnet inputs precomputed on each ingestion refresh
+"""
+
+import os
+import time
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.accrual import growth_rate
+
+logger = logging.getLogger(__name__)
+
+# Time steps per path (long horizons use coarser steps) and reported checkpoints
+MAX_STEPS = int(os.getenv("SIMULATION_MAX_STEPS", 120))
+CHECKPOINTS = 12
+PERCENTILES = (5, 50, 95)
+
+
+class SimulationInputs:
+    """Per-subnet APY and emission volatility plus TAO price and its volatility
+
+    Built once per refresh from the cached subnet data and the stored
+    subnet snapshot and price history; arrays are indexed by subnet id.
+    """
+
+    def __init__(
+        self,
+        apys: np.ndarray,
+        emission_volatility: np.ndarray,
+        price: Optional[float],
+        price_volatility: float,
+        computed_at: Optional[float] = None,
+    ):
+        """Initialize inputs (volatilities are daily standard deviations of log changes;
+        emission_volatility has the same length as apys)"""
+        self.apys = apys
+        self.emission_volatility = emission_volatility
+        self.price = price
+        self.price_volatility = price_volatility
+        self.computed_at = computed_at if computed_at is not None else time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form (NaN as None) for sharing through the cache"""
+        return {
+            "apys": [None if np.isnan(v) else float(v) for v in self.apys],
+            "emission_volatility": [float(v) for v in self.emission_volatility],
+            "price": self.price,
+            "price_volatility": self.price_volatility,
+            "computed_at": self.computed_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SimulationInputs":
+        return cls(
+            np.array([np.nan if v is None else v for v in data["apys"]], dtype=np.float64),
+            np.array(data["emission_volatility"], dtype=np.float64),
+            data.get("price"),
+            data.get("price_volatility") or 0.0,
+            data["computed_at"],
+        )
+
+    def apy(self, subnet_id: int) -> float:
+        """APY of a subnet (NaN if unknown)"""
+        return float(self.apys[subnet_id]) if 0 <= subnet_id < len(self.apys) else float("nan")
+
+
+def emission_volatility(history: Dict[int, list], size: int) -> np.ndarray:
+    """Daily volatility of each subnet's emissions from get_subnet_history() 1d buckets
+
+    Series are padded into one NaN-filled matrix so all subnets are computed
+    in one pass; subnets with fewer than three positive samples get 0.
+    """
+    volatility = np.zeros(size)
+    series = {subnet_id: rows for subnet_id, rows in history.items() if 0 <= subnet_id < size and rows}
+    if not series:
+        return volatility
+
+    width = max(len(rows) for rows in series.values())
+    values = np.full((len(series), width), np.nan)
+    for row, rows in enumerate(series.values()):
+        values[row, :len(rows)] = [r["emissions"] or np.nan for r in rows]
+    changes = np.diff(np.log(np.where(values > 0, values, np.nan)), axis=1)
+    enough = np.sum(~np.isnan(changes), axis=1) >= 2
+    volatility[np.array(list(series))[enough]] = np.nanstd(changes[enough], axis=1)
+    return volatility
+
+
+def price_volatility(candles: List[Dict[str, Any]]) -> float:
+    """Daily volatility of TAO/USD from 1d candles (0 with fewer than three)"""
+    closes = np.array([c["close"] for c in candles if c.get("close")], dtype=np.float64)
+    if len(closes) < 3:
+        return 0.0
+    return float(np.std(np.diff(np.log(closes))))
+
+
+def parameter_hash(inputs: SimulationInputs, **params: Any) -> str:
+    """Cache key suffix for one simulation: the parameters plus the inputs' version"""
+    payload = json.dumps({"inputs": inputs.computed_at, **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def simulate(
+    inputs: SimulationInputs,
+    amount: float,
+    days: int,
+    subnet_ids: List[int],
+    paths: int,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Project staking amount TAO in each subnet for days, all subnets at once
+
+    The deterministic projection compounds the current APY daily. The Monte
+    Carlo band lets each subnet's yield drift with its emission volatility
+    (a mean-preserving lognormal walk, so paths average out near the
+    projection) and values the result at a TAO price walking with the price
+    volatility, shared by all subnets on a path. Arrays are (subnet, path,
+    step); seed makes a given simulation reproducible.
+    """
+    known = [s for s in subnet_ids if not np.isnan(inputs.apy(s))]
+    unknown = [s for s in subnet_ids if s not in known]
+    steps = min(days, MAX_STEPS)
+    dt = days / steps
+    checkpoint_steps = np.unique(np.linspace(0, steps, min(steps, CHECKPOINTS) + 1).round().astype(int))
+    checkpoint_days = (checkpoint_steps * dt).round(2)
+
+    result = {
+        "amount": amount,
+        "days": days,
+        "paths": paths,
+        "price": inputs.price,
+        "price_volatility": inputs.price_volatility,
+        "checkpoints": checkpoint_days.tolist(),
+        "subnets": [],
+        "unknown": unknown,
+    }
+    if not known:
+        return result
+
+    ids = np.array(known)
+    apy = np.maximum(inputs.apys[ids], 0.0)
+    rate = growth_rate(apy) / 365  # continuous daily rate
+    sigma = inputs.emission_volatility[ids]
+    t = np.arange(steps + 1) * dt
+
+    projected = amount * np.exp(rate[:, None] * t[None, :])
+
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((len(ids), paths, steps), dtype=np.float32)
+    walk = np.cumsum(shocks * (sigma[:, None, None] * np.sqrt(dt)).astype(np.float32), axis=2)
+    walk -= (0.5 * sigma[:, None, None] ** 2 * t[None, None, 1:]).astype(np.float32)
+    yields = rate[:, None, None].astype(np.float32) * np.exp(walk)
+    log_tokens = np.zeros((len(ids), paths, steps + 1), dtype=np.float32)
+    np.cumsum(yields * np.float32(dt), axis=2, out=log_tokens[:, :, 1:])
+    tokens = amount * np.exp(log_tokens[:, :, checkpoint_steps])
+    tao_band = np.percentile(tokens, PERCENTILES, axis=1)
+
+    usd_band = None
+    if inputs.price:
+        price_shocks = rng.standard_normal((paths, steps), dtype=np.float32)
+        price_sigma = inputs.price_volatility
+        log_price = np.zeros((paths, steps + 1), dtype=np.float32)
+        np.cumsum(price_shocks * np.float32(price_sigma * np.sqrt(dt)), axis=1, out=log_price[:, 1:])
+        log_price -= np.float32(0.5 * price_sigma ** 2) * t.astype(np.float32)
+        usd = tokens * (inputs.price * np.exp(log_price[:, checkpoint_steps]))[None, :, :]
+        usd_band = np.percentile(usd, PERCENTILES, axis=1)
+
+    for i, subnet_id in enumerate(known):
+        entry = {
+            "subnet_id": subnet_id,
+            "apy": float(apy[i]),
+            "emission_volatility": float(sigma[i]),
+            "projected": projected[i, checkpoint_steps].round(6).tolist(),
+            "band": {f"p{p}": tao_band[k, i].round(6).tolist() for k, p in enumerate(PERCENTILES)},
+        }
+        if usd_band is not None:
+            entry["projected_usd"] = (projected[i, checkpoint_steps] * inputs.price).round(2).tolist()
+            entry["band_usd"] = {f"p{p}": usd_band[k, i].round(2).tolist() for k, p in enumerate(PERCENTILES)}
+        result["subnets"].append(entry)
+    return result
@@ -0,0 +1,35 @@
+"""
+Single-Flight Request Coalescing
+Ensures only one fetch per key runs at a time; concurrent callers share its result
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-process task"""
+
+    def __init__(self):
+        """Initialize in-flight task registry"""
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn for key unless a call is already in flight, then share its result"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug(f"Joining in-flight fetch for {key}")
+
+        # Shield so a cancelled caller does not cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: str) -> bool:
+        """Check whether a fetch for key is currently running"""
+        return key in self._inflight
@@ -5,125 +5,110 @@ Fetches Bittensor subnet and validator data
 
 import httpx
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from services.resilience import UpstreamError, UpstreamGuard
+from services.upstream import TAOSTATS_UPSTREAM, create_upstream_client
 
 logger = logging.getLogger(__name__)
 
 class TAOStatsService:
     """TAOStats API integration for Bittensor data"""
     
-    def __init__(self):
-        """Initialize TAOStats service"""
-        self.base_url = "https://api.taostats.io/api"
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, guard: Optional[UpstreamGuard] = None):
+        """Initialize TAOStats service with a shared pooled client and upstream guard
+        
+        Methods raise UpstreamError when TAOStats is unavailable (circuit open,
+        rate limited or failing after retries) so callers can fall back to
+        cached data instead of caching an empty result.
+        """
+        self.client = client or create_upstream_client(TAOSTATS_UPSTREAM)
+        self.guard = guard or UpstreamGuard.from_config(TAOSTATS_UPSTREAM)
     
     async def get_subnets(self) -> List[Dict[str, Any]]:
         """Get list of all subnets"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/subnets",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(self.client, "/subnets")
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching subnets: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return []
     
     async def get_subnet(self, subnet_id: int) -> Dict[str, Any]:
         """Get specific subnet details"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/subnet/{subnet_id}",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(self.client, f"/subnet/{subnet_id}")
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching subnet {subnet_id}: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return {}
     
     async def get_validators(self) -> List[Dict[str, Any]]:
         """Get all validators across subnets"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/validators",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(self.client, "/validators")
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching validators: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return []
     
     async def get_market_data(self) -> Dict[str, Any]:
         """Get market data from TAOStats"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/market",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(self.client, "/market")
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching market data: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return {}
     
     async def get_emissions(self) -> Dict[str, Any]:
         """Get emissions data"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/emissions",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(self.client, "/emissions")
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching emissions: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return {}
     
     async def get_subnet_validators(self, subnet_id: int) -> List[Dict[str, Any]]:
         """Get validators for a specific subnet"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/subnet/{subnet_id}/validators",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(self.client, f"/subnet/{subnet_id}/validators")
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching subnet {subnet_id} validators: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return []
     
     async def get_subnet_neurons(self, subnet_id: int) -> List[Dict[str, Any]]:
         """Get neurons (miners) for a specific subnet"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/subnet/{subnet_id}/neurons",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(self.client, f"/subnet/{subnet_id}/neurons")
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching subnet {subnet_id} neurons: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return []
     
     async def search_hotkey(self, hotkey: str) -> Dict[str, Any]:
         """Search for a hotkey"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/search/{hotkey}",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.guard.get(self.client, f"/search/{hotkey}")
+            return response.json()
         except Exception as e:
             logger.error(f"Error searching hotkey {hotkey}: {e}")
+            if isinstance(e, UpstreamError):
+                raise
             return {}
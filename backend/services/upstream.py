@@ -0,0 +1,105 @@
+"""
+Upstream HTTP Clients
+Long-lived pooled httpx clients shared by the upstream API services
+"""
+
+import os
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class UpstreamConfig:
+    """Connection, rate limit and circuit breaker settings for one upstream API
+
+    rate_limit_per_minute / rate_limit_burst should match the provider's quota;
+    the token bucket is shared by every worker through Redis.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        rate_limit_per_minute: float = 60.0,
+        rate_limit_burst: int = 10,
+        rate_limit_wait: float = 2.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        max_retries: int = 2,
+    ):
+        """Initialize upstream settings"""
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.rate_limit_burst = rate_limit_burst
+        self.rate_limit_wait = rate_limit_wait
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_retries = max_retries
+
+    @classmethod
+    def from_env(cls, name: str, base_url: str, **defaults) -> "UpstreamConfig":
+        """Build config with <NAME>_BASE_URL, <NAME>_TIMEOUT, <NAME>_RATE_LIMIT, ... overrides"""
+        prefix = name.upper()
+        config = cls(name, base_url, **defaults)
+        config.base_url = os.getenv(f"{prefix}_BASE_URL", config.base_url)
+        config.timeout = float(os.getenv(f"{prefix}_TIMEOUT", config.timeout))
+        config.connect_timeout = float(os.getenv(f"{prefix}_CONNECT_TIMEOUT", config.connect_timeout))
+        config.max_connections = int(os.getenv(f"{prefix}_MAX_CONNECTIONS", config.max_connections))
+        config.max_keepalive_connections = int(
+            os.getenv(f"{prefix}_MAX_KEEPALIVE", config.max_keepalive_connections)
+        )
+        config.keepalive_expiry = float(os.getenv(f"{prefix}_KEEPALIVE_EXPIRY", config.keepalive_expiry))
+        config.http2 = os.getenv(f"{prefix}_HTTP2", str(config.http2)).lower() == "true"
+        config.rate_limit_per_minute = float(os.getenv(f"{prefix}_RATE_LIMIT", config.rate_limit_per_minute))
+        config.rate_limit_burst = int(os.getenv(f"{prefix}_RATE_BURST", config.rate_limit_burst))
+        config.rate_limit_wait = float(os.getenv(f"{prefix}_RATE_WAIT", config.rate_limit_wait))
+        config.failure_threshold = int(os.getenv(f"{prefix}_FAILURE_THRESHOLD", config.failure_threshold))
+        config.recovery_timeout = float(os.getenv(f"{prefix}_RECOVERY_TIMEOUT", config.recovery_timeout))
+        config.max_retries = int(os.getenv(f"{prefix}_MAX_RETRIES", config.max_retries))
+        return config
+
+
+def create_upstream_client(config: UpstreamConfig) -> httpx.AsyncClient:
+    """Create a pooled keep-alive client for an upstream (close it with aclose())"""
+    http2 = config.http2 and HTTP2_AVAILABLE
+    if config.http2 and not HTTP2_AVAILABLE:
+        logger.warning(f"h2 not installed, {config.name} client falling back to HTTP/1.1")
+
+    return httpx.AsyncClient(
+        base_url=config.base_url,
+        http2=http2,
+        timeout=httpx.Timeout(config.timeout, connect=config.connect_timeout),
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        headers={"Accept": "application/json"},
+    )
+
+
+TAOSTATS_UPSTREAM = UpstreamConfig.from_env("taostats", "https://api.taostats.io/api")
+# CoinGecko's public API allows roughly 30 calls/min
+COINGECKO_UPSTREAM = UpstreamConfig.from_env(
+    "coingecko", "https://api.coingecko.com/api/v3", rate_limit_per_minute=30, rate_limit_burst=5
+)
@@ -0,0 +1,181 @@
+"""
+Validator Index
+In-memory columnar index over the validator list for server-side sorting,
+filtering and cursor pagination
+"""
+
+import base64
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column -> upstream field names to read it from, in order of preference
+COLUMN_FIELDS = {
+    "hotkey": ("hotkey", "hotkey_ss58"),
+    "subnet": ("subnet_id", "netuid"),
+    "stake": ("stake", "total_stake"),
+    "take": ("take",),
+}
+
+SORTABLE = ("stake", "take", "subnet", "hotkey")
+
+
+class InvalidQuery(ValueError):
+    """Bad sort, field or cursor parameter"""
+
+
+def _first(row: Dict[str, Any], names: Sequence[str]) -> Any:
+    for name in names:
+        value = row.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _number(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class ValidatorIndex:
+    """Validator rows plus NumPy columns for the sortable and filterable fields
+
+    Built once per refreshed validator list; queries are vectorized over the
+    columns and only the returned page of rows is touched. There is one row
+    per (hotkey, subnet), so pages are ordered by (sort column, hotkey,
+    subnet, row position), which is unique, and cursors carry the last row's
+    key, so paging stays stable when the list is rebuilt between requests.
+    The row position only separates exact duplicates.
+    """
+
+    def __init__(
+        self,
+        validators: List[Dict[str, Any]],
+        version: Optional[float] = None,
+        content: Optional[str] = None,
+    ):
+        """Build columns from a TAOStats validator list (version: its cache entry
+        version, content: a hash of the list)"""
+        self.rows = validators
+        self.version = version
+        self.content = content
+        self.hotkey = np.array(
+            [str(_first(row, COLUMN_FIELDS["hotkey"]) or "") for row in validators], dtype=str
+        )
+        self.subnet = np.array(
+            [_number(_first(row, COLUMN_FIELDS["subnet"]), -1) for row in validators], dtype=np.int64
+        )
+        self.stake = np.array(
+            [_number(_first(row, COLUMN_FIELDS["stake"]), 0.0) for row in validators], dtype=np.float64
+        )
+        self.take = np.array(
+            [_number(_first(row, COLUMN_FIELDS["take"]), 0.0) for row in validators], dtype=np.float64
+        )
+        self.position = np.arange(len(validators))
+        # Sort permutations, computed on first use per column and direction
+        self._orders: Dict[Tuple[str, bool], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _order(self, column: str, descending: bool) -> np.ndarray:
+        """Row positions sorted by column (ties broken by hotkey, subnet, position ascending)"""
+        order = self._orders.get((column, descending))
+        if order is None:
+            values = getattr(self, column)
+            ties = (self.position, self.subnet, self.hotkey)
+            if column == "hotkey":
+                order = np.lexsort(ties)
+                if descending:
+                    order = order[::-1]
+            else:
+                order = np.lexsort((*ties, -values if descending else values))
+            self._orders[(column, descending)] = order
+        return order
+
+    def query(
+        self,
+        sort: str = "-stake",
+        subnet: Optional[int] = None,
+        min_stake: Optional[float] = None,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """Filter, sort and page the validators
+
+        sort is a column name, prefixed with "-" for descending. Returns the
+        page rows (projected to fields, if given), the total number of matches
+        and the cursor for the next page (None on the last page).
+        """
+        descending = sort.startswith("-")
+        column = sort.lstrip("-")
+        if column not in SORTABLE:
+            raise InvalidQuery(f"Cannot sort by {column}; use one of {', '.join(SORTABLE)}")
+
+        mask = np.ones(len(self.rows), dtype=bool)
+        if subnet is not None:
+            mask &= self.subnet == subnet
+        if min_stake is not None:
+            mask &= self.stake >= min_stake
+        total = int(mask.sum())
+
+        if cursor:
+            mask &= self._after_cursor(cursor, sort, column, descending)
+
+        order = self._order(column, descending)
+        positions = order[mask[order]][:limit + 1]
+        has_more = len(positions) > limit
+        positions = positions[:limit]
+
+        page = [self.rows[i] for i in positions]
+        if fields:
+            page = [{field: row.get(field) for field in fields} for row in page]
+
+        next_cursor = None
+        if has_more:
+            last = positions[-1]
+            next_cursor = self._encode_cursor(
+                sort,
+                getattr(self, column)[last].item(),
+                str(self.hotkey[last]),
+                int(self.subnet[last]),
+                int(last),
+            )
+        return {"validators": page, "total": total, "next_cursor": next_cursor}
+
+    def _after_cursor(self, cursor: str, sort: str, column: str, descending: bool) -> np.ndarray:
+        """Mask of rows strictly after the cursor's (value, hotkey, subnet, position) in sort order"""
+        try:
+            cursor_sort, value, hotkey, subnet, position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except Exception:
+            raise InvalidQuery("Malformed cursor")
+        if cursor_sort != sort:
+            raise InvalidQuery("Cursor was issued for a different sort")
+
+        if column == "hotkey":
+            return self._after_key(hotkey, subnet, position, reverse=descending)
+        values = getattr(self, column)
+        beyond = values < value if descending else values > value
+        return beyond | ((values == value) & self._after_key(hotkey, subnet, position))
+
+    def _after_key(self, hotkey: str, subnet: int, position: int, reverse: bool = False) -> np.ndarray:
+        """Mask of rows whose (hotkey, subnet, position) comes after the given one"""
+        if reverse:
+            return (self.hotkey < hotkey) | ((self.hotkey == hotkey) & (
+                (self.subnet < subnet) | ((self.subnet == subnet) & (self.position < position))
+            ))
+        return (self.hotkey > hotkey) | ((self.hotkey == hotkey) & (
+            (self.subnet > subnet) | ((self.subnet == subnet) & (self.position > position))
+        ))
+
+    @staticmethod
+    def _encode_cursor(sort: str, value: Any, hotkey: str, subnet: int, position: int) -> str:
+        payload = [sort, value, hotkey, subnet, position]
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
@@ -105,7 +105,7 @@ async def broadcast_price_updates(coingecko_service, cache_service):
         try:
             price = await coingecko_service.get_tao_price()
             await manager.broadcast_to_channel("price", price)
-            cache_service.set("tao_price_live", price, ttl=15)
+            await cache_service.set("tao_price_live", price, ttl=15)
             await asyncio.sleep(15)  # Update every 15 seconds
         except Exception as e:
             logger.error(f"Error broadcasting price: {e}")
@@ -0,0 +1,9 @@
+"""
+Test configuration
+Puts backend/ on sys.path so tests import services.* and main as the app does
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,82 @@
+"""
+Earnings accrual: APYs stay in percent from TAOStats through accrual to the stored positions
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from services.accrual import DAILY_EMISSION, STAKER_SHARE, accrue, subnet_apys
+from services.database import Database
+
+ADDRESS = "5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY"
+YEAR = 365 * 24 * 3600
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'accrual.db'}")
+    database = Database()
+    asyncio.run(database.connect())
+    assert database.engine is not None
+    yield database
+    asyncio.run(database.close())
+
+
+def test_subnet_apys_are_percent():
+    subnets = [
+        {"netuid": 1, "apy": 12.5, "emission": 1, "total_stake": 1000},
+        {"netuid": 2, "emission": 1, "total_stake": DAILY_EMISSION * STAKER_SHARE * 365},
+    ]
+    apys = subnet_apys(subnets, {})
+    assert apys[1] == 12.5
+    assert apys[2] == pytest.approx(50.0)  # half the emission over a year's worth of stake
+
+
+def test_accrue_reads_percent():
+    earnings = accrue(np.array([1000.0]), np.array([0.0]), np.array([12.5]), np.array([float(YEAR)]))
+    assert earnings[0] == pytest.approx(125.0)
+
+
+def test_accrual_round_trip_keeps_percent(db):
+    created = datetime.utcnow() - timedelta(days=365)
+    asyncio.run(db.add_positions_bulk([
+        {"user_address": ADDRESS, "subnet_id": 1, "amount": 1000.0, "apy": 12.5, "created_at": created},
+        {"user_address": ADDRESS, "subnet_id": 2, "amount": 1000.0, "apy": 10.0, "created_at": created},
+    ]))
+    apys = subnet_apys([{"netuid": 2, "apy": 20.0}], {})
+    asyncio.run(db.accrue_earnings(apys))
+
+    positions = {p["subnet_id"]: p for p in asyncio.run(db.get_user_staking_positions(ADDRESS))}
+    assert positions[1]["apy"] == 12.5
+    assert positions[1]["earnings"] == pytest.approx(125.0, rel=1e-3)
+    assert positions[2]["apy"] == 20.0
+    assert positions[2]["earnings"] == pytest.approx(200.0, rel=1e-3)
+    assert asyncio.run(db.get_portfolio(ADDRESS))["weighted_apy"] == pytest.approx(16.25)
+
+
+def test_subnet_apys_read_cached_emissions(monkeypatch):
+    main = pytest.importorskip("main")
+    from types import SimpleNamespace
+
+    from services.cache import CachedResponse
+
+    class FakeCache:
+        async def get_or_fetch(self, key, fetch, policy, tags=None):
+            return [{"netuid": 1, "emission": 1, "total_stake": 2 * STAKER_SHARE * 365}]
+
+        async def get_or_fetch_response(self, key, fetch, policy, tags=None):
+            assert key == "emissions"
+            return CachedResponse.from_payload({"daily_emission": 1})
+
+    async def upstream():
+        raise AssertionError("emissions fetched from upstream")
+
+    monkeypatch.setattr(main, "cache_service", FakeCache())
+    monkeypatch.setattr(main, "taostats_service", SimpleNamespace(get_subnets=upstream, get_emissions=upstream))
+    apys = asyncio.run(main.fetch_subnet_apys())
+    assert apys[1] == pytest.approx(50.0)
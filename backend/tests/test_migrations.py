@@ -0,0 +1,93 @@
+"""
+Startup migrations: run once per schema fingerprint, not on every connect
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import select, text
+
+from services import database as database_module
+from services.database import Database, SchemaVersion, schema_fingerprint
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'migrations.db'}")
+    database = Database()
+    asyncio.run(database.connect())
+    assert database.engine is not None
+    yield database
+    asyncio.run(database.close())
+
+
+def recorded(db):
+    async def read():
+        async with db.engine.connect() as conn:
+            return (await conn.scalars(select(SchemaVersion.fingerprint))).all()
+    return asyncio.run(read())
+
+
+def count_migrations(db, monkeypatch):
+    calls = []
+    add_missing_columns = db._add_missing_columns
+    
+    async def counted():
+        calls.append(1)
+        return await add_missing_columns()
+    
+    monkeypatch.setattr(db, "_add_missing_columns", counted)
+    return calls
+
+
+def test_connect_records_fingerprint(db):
+    assert recorded(db) == [schema_fingerprint()]
+
+
+def test_current_schema_skips_migrations(db, monkeypatch):
+    calls = count_migrations(db, monkeypatch)
+    asyncio.run(db._migrate())
+    assert calls == []
+
+
+def test_revision_bump_migrates_once(db, monkeypatch):
+    calls = count_migrations(db, monkeypatch)
+    monkeypatch.setattr(database_module, "MIGRATION_REVISION", database_module.MIGRATION_REVISION + 1)
+    asyncio.run(db._migrate())
+    asyncio.run(db._migrate())
+    assert calls == [1]
+    assert recorded(db) == [schema_fingerprint()]
+
+
+def test_added_accrued_at_is_backfilled_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'legacy.db'}")
+    created = "2026-01-01 00:00:00.000000"
+    
+    async def run():
+        database = Database()
+        await database.connect()
+        async with database.engine.begin() as conn:
+            await conn.execute(text("DROP TABLE staking_positions"))
+            await conn.execute(text("DROP TABLE schema_version"))
+            await conn.execute(text(
+                "CREATE TABLE staking_positions (id INTEGER PRIMARY KEY, user_address VARCHAR, subnet_id INTEGER, "
+                "amount FLOAT, apy FLOAT, earnings FLOAT, status VARCHAR, created_at DATETIME, updated_at DATETIME)"
+            ))
+            await conn.execute(text(f"INSERT INTO staking_positions (id, created_at) VALUES (1, '{created}')"))
+        await database._migrate()
+        async with database.engine.begin() as conn:
+            backfilled = await conn.scalar(text("SELECT accrued_at FROM staking_positions WHERE id = 1"))
+            await conn.execute(text(f"INSERT INTO staking_positions (id, created_at) VALUES (2, '{created}')"))
+        monkeypatch.setattr(database_module, "MIGRATION_REVISION", database_module.MIGRATION_REVISION + 1)
+        await database._migrate()
+        async with database.engine.connect() as conn:
+            untouched = await conn.scalar(text("SELECT accrued_at FROM staking_positions WHERE id = 2"))
+        await database.close()
+        return backfilled, untouched
+    
+    backfilled, untouched = asyncio.run(run())
+    assert backfilled == created
+    assert untouched is None
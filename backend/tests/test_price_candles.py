@@ -0,0 +1,75 @@
+"""
+Price candle rollups: concurrent writers merge into the same candles without losing samples
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from services.database import PRICE_RESOLUTIONS, Database, fold_candles
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'candles.db'}")
+    database = Database()
+    asyncio.run(database.connect())
+    assert database.engine is not None
+    yield database
+    asyncio.run(database.close())
+
+
+def samples(count, seed):
+    rng = random.Random(seed)
+    return [(START + timedelta(microseconds=rng.randrange(2 * 3600 * 10 ** 6)), rng.uniform(100, 200)) for _ in range(count)]
+
+
+def expected(points, resolution):
+    return {candle["bucket"]: candle for candle in fold_candles(sorted(points), PRICE_RESOLUTIONS[resolution][0])}
+
+
+def stored(db, resolution):
+    candles = asyncio.run(db.get_price_candles(resolution, START, START + timedelta(days=1)))
+    return {datetime.fromisoformat(candle["timestamp"]): candle for candle in candles}
+
+
+def assert_candles(db, points):
+    for resolution in ("1m", "1h", "1d"):
+        want = expected(points, resolution)
+        got = stored(db, resolution)
+        assert set(got) == set(want)
+        for bucket, candle in want.items():
+            for field in ("open", "high", "low", "close"):
+                assert got[bucket][field] == pytest.approx(candle[field]), (resolution, bucket, field)
+
+
+def test_concurrent_writers_lose_no_samples(db):
+    # Many small batches for the same buckets, written concurrently and out of order
+    batches = [samples(20, seed) for seed in range(30)]
+
+    async def run():
+        return await asyncio.gather(*(db.add_price_points(batch) for batch in batches))
+
+    assert asyncio.run(run()) == [20] * len(batches)
+    assert_candles(db, [point for batch in batches for point in batch])
+
+
+def test_replayed_and_older_samples_merge_in_time_order(db):
+    late = [(timestamp + timedelta(hours=2), price) for timestamp, price in samples(50, 1)]
+    early = samples(50, 2)
+    asyncio.run(db.add_price_points(late))
+    asyncio.run(db.add_price_points(early))
+    asyncio.run(db.add_price_points(late[:10]))
+    assert_candles(db, late + early)
+
+
+def test_backfill_mark_never_moves_back(db):
+    asyncio.run(db.add_price_points(samples(5, 3), backfilled_until=START + timedelta(hours=2)))
+    asyncio.run(db.add_price_points(samples(5, 4), backfilled_until=START + timedelta(hours=1)))
+    assert asyncio.run(db.get_price_backfill_mark()) == START + timedelta(hours=2)
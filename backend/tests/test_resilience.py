@@ -0,0 +1,93 @@
+"""
+Upstream resilience tests: the circuit breaker counts logical calls, not retries
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from services import resilience
+from services.cache import CachedResponse, is_error_payload
+from services.resilience import CircuitBreaker, TokenBucket, UpstreamError, UpstreamGuard
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0.0)
+
+
+def make_guard(statuses, max_retries=2, failure_threshold=5):
+    """Guard over a mock upstream answering with statuses in turn (the last one repeats)"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(statuses[min(len(requests), len(statuses)) - 1], json={})
+
+    client = httpx.AsyncClient(base_url="https://upstream.test", transport=httpx.MockTransport(handler))
+    guard = UpstreamGuard(
+        "test",
+        TokenBucket("test", rate_per_minute=6000, burst=100),
+        CircuitBreaker("test", failure_threshold=failure_threshold),
+        max_retries=max_retries,
+    )
+    return guard, client, requests
+
+
+def test_retries_of_one_call_count_as_one_failure():
+    guard, client, requests = make_guard([503])
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                await guard.get(client, "/subnet/999")
+
+    asyncio.run(run())
+    assert len(requests) == 6
+    assert guard.breaker.failures == 2
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_opens_after_threshold_logical_failures():
+    guard, client, requests = make_guard([503], failure_threshold=3)
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(UpstreamError):
+                await guard.get(client, "/subnet/999")
+        with pytest.raises(resilience.CircuitOpenError):
+            await guard.get(client, "/subnets")
+
+    asyncio.run(run())
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    assert len(requests) == 9
+
+
+def test_success_after_retry_records_no_failure():
+    guard, client, requests = make_guard([503, 503, 200])
+
+    async def run():
+        return await guard.get(client, "/subnets")
+
+    assert asyncio.run(run()).status_code == 200
+    assert guard.breaker.failures == 0
+
+
+def test_client_errors_do_not_count_against_circuit():
+    guard, client, requests = make_guard([404])
+
+    async def run():
+        with pytest.raises(httpx.HTTPStatusError):
+            await guard.get(client, "/subnet/999")
+
+    asyncio.run(run())
+    assert len(requests) == 1
+    assert guard.breaker.failures == 0
+
+
+def test_error_payloads_are_not_last_known_good():
+    assert is_error_payload({"error": "HTTP 400"})
+    assert CachedResponse.from_payload({"error": "HTTP 400"}).error
+    assert not is_error_payload({"price": 1.0, "error": None})
+    assert not CachedResponse.from_payload([{"netuid": 1}]).error
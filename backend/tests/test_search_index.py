@@ -0,0 +1,90 @@
+"""
+Search index versioning: rebuilt only when the cached sources' content changes
+"""
+
+import asyncio
+import types
+
+import pytest
+
+main = pytest.importorskip("main")
+
+from services.search_index import SearchIndex
+
+VALIDATORS = [{"hotkey": "5Hotkey1", "coldkey": "5Cold1", "name": "Alpha"}]
+NEURONS = [{"type": "neuron", "hotkey": "5Neuron1", "coldkey": "5Cold2", "uid": 1, "subnet": 1}]
+
+
+class FakeCache:
+    """The two cache reads get_search_index makes, with a settable entry version"""
+
+    def __init__(self):
+        self.entries = {"validators_list": (VALIDATORS, 1.0), "neurons_list": (NEURONS, 1.0)}
+
+    def write(self, key, value):
+        """Rewrite an entry as ingestion does: a new version every time"""
+        self.entries[key] = (value, self.entries[key][1] + 1)
+
+    async def get_or_fetch_entry(self, key, fetch, policy, tags=None):
+        return self.entries[key]
+
+    async def get_entry(self, key):
+        return self.entries.get(key)
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    counter = {"count": 0}
+
+    class CountingIndex(SearchIndex):
+        def __init__(self, *args, **kwargs):
+            counter["count"] += 1
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(main, "SearchIndex", CountingIndex)
+    monkeypatch.setattr(main, "search_index", None)
+    monkeypatch.setattr(main, "cache_service", FakeCache())
+    monkeypatch.setattr(main, "taostats_service", types.SimpleNamespace(get_validators=None))
+    return counter
+
+
+def test_same_version_reuses_index(builds):
+    async def run():
+        return [await main.get_search_index() for _ in range(5)]
+
+    indexes = asyncio.run(run())
+    assert builds["count"] == 1
+    assert all(index is indexes[0] for index in indexes)
+
+
+def test_rewrite_with_same_content_keeps_index(builds):
+    async def run():
+        first = await main.get_search_index()
+        main.cache_service.write("validators_list", [dict(row) for row in VALIDATORS])
+        main.cache_service.write("neurons_list", list(NEURONS))
+        return first, await main.get_search_index()
+
+    first, second = asyncio.run(run())
+    assert builds["count"] == 1
+    assert second is first
+    assert second.version == (2.0, 2.0)
+
+
+def test_changed_content_rebuilds(builds):
+    async def run():
+        await main.get_search_index()
+        main.cache_service.write("neurons_list", NEURONS + [dict(NEURONS[0], hotkey="5Neuron2", uid=2)])
+        return await main.get_search_index()
+
+    index = asyncio.run(run())
+    assert builds["count"] == 2
+    assert index.knows("5Neuron2")
+
+
+def test_concurrent_requests_share_one_build(builds):
+    async def run():
+        return await asyncio.gather(*(main.get_search_index() for _ in range(10)))
+
+    indexes = asyncio.run(run())
+    assert builds["count"] == 1
+    assert len({id(index) for index in indexes}) == 1
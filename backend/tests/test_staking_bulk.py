@@ -0,0 +1,81 @@
+"""
+Bulk staking event ingestion: only allowed callers write, malformed events are rejected with 4xx
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+main = pytest.importorskip("main")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from services.auth import AuthService
+from services.database import Database, Transaction
+
+ADDRESS = "5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY"
+URL = "/api/staking/transactions/bulk"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'bulk.db'}")
+    database = Database()
+    asyncio.run(database.connect())
+    monkeypatch.setattr(main, "db", database)
+    monkeypatch.setattr(main, "auth_service", AuthService(database))
+    monkeypatch.setattr(main, "STAKING_INGEST_USERS", {"indexer@example.com"})
+    yield TestClient(main.app)
+    asyncio.run(database.close())
+
+
+def bearer(email):
+    return {"Authorization": f"Bearer {main.auth_service.create_access_token({'sub': '1', 'email': email})}"}
+
+
+def event(**overrides):
+    return {"address": ADDRESS, "type": "stake", "subnet_id": 1, "amount": 1.5, **overrides}
+
+
+def stored():
+    async def count():
+        async with main.db.engine.connect() as conn:
+            return await conn.scalar(select(func.count()).select_from(Transaction))
+    return asyncio.run(count())
+
+
+def test_requires_token(client):
+    assert client.post(URL, json={"transactions": [event()]}).status_code == 401
+    assert client.post(URL, json={"transactions": [event()]}, headers={"Authorization": "Bearer bogus"}).status_code == 401
+    assert stored() == 0
+
+
+def test_requires_allowed_caller(client):
+    response = client.post(URL, json={"transactions": [event()]}, headers=bearer("someone@example.com"))
+    assert response.status_code == 403
+    assert stored() == 0
+
+
+@pytest.mark.parametrize("bad", [
+    {"amount": 0},
+    {"amount": -1},
+    {"amount": "NaN"},
+    {"amount": "Infinity"},
+    {"address": "not-an-address"},
+    {"address": ""},
+    {"subnet_id": -1},
+    {"subnet_id": 65536},
+])
+def test_rejects_malformed_events(client, bad):
+    response = client.post(URL, json={"transactions": [event(), event(**bad)]}, headers=bearer("indexer@example.com"))
+    assert response.status_code == 422
+    assert stored() == 0
+
+
+def test_inserts_batch(client):
+    response = client.post(URL, json={"transactions": [event(), event(type="unstake", amount=0.5)]}, headers=bearer("Indexer@example.com"))
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 2}
+    assert stored() == 2